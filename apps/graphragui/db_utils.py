@@ -60,6 +60,8 @@ def fetch_indexing_job(git_repo: str,
         or None if the job is not found or is incomplete.
     """
     try:
+        # The jobs table is updated in place (status and cached results), so
+        # it is always read from the remote database, never from a replica.
         db = get_lancedb_connection(bucket_name, "indexing_jobs", use_https)
 
         data = [
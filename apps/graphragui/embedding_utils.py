@@ -0,0 +1,315 @@
+##############################################################################
+# Batched GraphRAG Embeddings
+##############################################################################
+"""
+Embedding client for GraphRAG indexing. Texts are deduplicated, looked up
+in a persistent cache keyed by the content hash of the model and text, and
+only the missing texts are sent to the embedding endpoint, packed into
+token-budgeted requests with a bounded number of requests in flight.
+
+Run the GraphRAG CLI through this module to index with the client:
+
+    python embedding_utils.py index --root <root> --config <settings.yaml>
+"""
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import traceback
+import numpy as np
+import search_index_utils
+from openai import OpenAI
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".embedding_cache/embeddings.db")
+
+_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS") or 8191)
+
+_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE") or 256)
+
+_CONCURRENT_REQUESTS = int(os.getenv("EMBED_CONCURRENT_REQUESTS") or 8)
+
+_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES") or 5)
+
+_ENCODING = os.getenv("EMBED_ENCODING", "cl100k_base")
+
+# The GraphRAG model types served by the client (OpenAI-compatible endpoints).
+_GRAPHRAG_MODEL_TYPES = ["embedding", "openai_embedding"]
+
+
+##############################################################################
+# Cache
+##############################################################################
+class EmbeddingCache:
+    """A SQLite-backed embedding cache keyed by the content hash of the model and text."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list) -> dict:
+        """Returns the cached embeddings of the given keys."""
+        results = {}
+
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+
+                rows = self._db.execute(f"SELECT key, vector FROM embeddings WHERE key IN "
+                                        f"({', '.join('?' * len(chunk))})", chunk).fetchall()
+
+                results.update({key: np.frombuffer(vector, dtype=np.float32).tolist() for key, vector in rows})
+
+        return results
+
+    def put_many(self, embeddings: dict):
+        """Stores the given embeddings, keyed by cache key."""
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                                 [(key, np.asarray(vector, dtype=np.float32).tobytes())
+                                  for key, vector in embeddings.items()])
+            self._db.commit()
+
+
+##############################################################################
+# Client
+##############################################################################
+def _get_token_counter():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(_ENCODING)
+
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    except Exception:
+
+        return lambda text: len(text) // 4 + 1
+
+
+class EmbeddingClient:
+    """
+    Embeds texts through an OpenAI-compatible endpoint. Each text is
+    embedded at most once: cached texts are served from the cache, and texts
+    already being embedded by a concurrent call wait for that request.
+    """
+
+    def __init__(self, model: str, api_base: str, api_key: str, cache: EmbeddingCache):
+        self.model = model
+        self.cache = cache
+        self.stats = {"texts": 0, "cached": 0, "embedded": 0, "requests": 0}
+        self._client = OpenAI(api_key=api_key, base_url=api_base)
+        self._executor = ThreadPoolExecutor(max_workers=_CONCURRENT_REQUESTS)
+        self._count_tokens = _get_token_counter()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def embed(self, texts: list) -> list:
+        """
+        Returns the embeddings of the given texts, in order.
+        Args:
+            texts: The texts to embed.
+        Returns:
+            The embedding of each text.
+        """
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+
+        unique = dict(zip(keys, texts))
+
+        embeddings = self.cache.get_many(list(unique))
+
+        owned, waiting = {}, {}
+
+        with self._lock:
+            for key, text in unique.items():
+
+                if key in embeddings:
+                    continue
+
+                if key in self._pending:
+                    waiting[key] = self._pending[key]
+
+                else:
+                    owned[key] = self._pending[key] = Future()
+
+            self.stats["texts"] += len(texts)
+
+            self.stats["cached"] += len(unique) - len(owned) - len(waiting)
+
+        batches = self._create_batches([(key, unique[key]) for key in owned])
+
+        requests = [self._executor.submit(self._embed_batch, batch) for batch in batches]
+
+        failure = None
+
+        for batch, request in zip(batches, requests):
+            try:
+                results = request.result()
+
+                for key, _ in batch:
+                    owned[key].set_result(results[key])
+
+            except Exception as e:
+                # Fail the texts of the batch, so that concurrent callers do not wait on them.
+                failure = failure or e
+
+                for key, _ in batch:
+                    owned[key].set_exception(e)
+
+        with self._lock:
+            for key in owned:
+                self._pending.pop(key, None)
+
+        if failure:
+            raise failure
+
+        for key, future in {**owned, **waiting}.items():
+            embeddings[key] = future.result()
+
+        return [embeddings[key] for key in keys]
+
+    def _create_batches(self, items: list) -> list:
+        """Packs (key, text) items into batches of EMBED_BATCH_MAX_TOKENS tokens and EMBED_BATCH_MAX_SIZE texts."""
+        batches, batch, batch_tokens = [], [], 0
+
+        for key, text in items:
+            tokens = self._count_tokens(text)
+
+            if batch and (len(batch) >= _BATCH_MAX_SIZE or batch_tokens + tokens > _BATCH_MAX_TOKENS):
+                batches.append(batch)
+
+                batch, batch_tokens = [], 0
+
+            batch.append((key, text))
+
+            batch_tokens += tokens
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _embed_batch(self, batch: list) -> dict:
+        for attempt in range(1, _MAX_RETRIES + 1):
+            try:
+                response = self._client.embeddings.create(model=self.model, input=[text for _, text in batch])
+
+                break
+
+            except Exception as e:
+                if attempt == _MAX_RETRIES:
+                    raise
+
+                delay = min(2 ** attempt, 60)
+
+                print(f"Embedding request failed (attempt {attempt}/{_MAX_RETRIES}): {e}; retrying in {delay}s...")
+
+                time.sleep(delay)
+
+        embeddings = {key: item.embedding
+                      for (key, _), item in zip(batch, sorted(response.data, key=lambda item: item.index))}
+
+        self.cache.put_many(embeddings)
+
+        with self._lock:
+            self.stats["embedded"] += len(batch)
+
+            self.stats["requests"] += 1
+
+        return embeddings
+
+
+_clients = {}
+
+_clients_lock = threading.Lock()
+
+
+def get_embedding_client(model: str = None, api_base: str = None, api_key: str = None) -> EmbeddingClient:
+    """
+    Returns the (shared) embedding client of a model. Defaults to the model
+    configured with the EMBED_LLM_* variables.
+    """
+    model = model or os.getenv("EMBED_LLM_ID")
+
+    api_base = api_base or os.getenv("EMBED_LLM_API_BASE")
+
+    with _clients_lock:
+        if (model, api_base) not in _clients:
+            _clients[(model, api_base)] = EmbeddingClient(model, api_base, api_key or os.getenv("EMBED_LLM_TOKEN"),
+                                                          EmbeddingCache(_CACHE_PATH))
+
+        return _clients[(model, api_base)]
+
+
+##############################################################################
+# GraphRAG Integration
+##############################################################################
+class BatchedEmbeddingModel:
+    """A GraphRAG embedding model backed by the shared EmbeddingClient."""
+
+    def __init__(self, *, name: str, config, callbacks=None, cache=None, **kwargs):
+        self.name = name
+        self.config = config
+        self.client = get_embedding_client(config.model, config.api_base, config.api_key)
+
+    def embed_batch(self, text_list: list, **kwargs) -> list:
+        return self.client.embed(text_list)
+
+    async def aembed_batch(self, text_list: list, **kwargs) -> list:
+        return await asyncio.to_thread(self.client.embed, text_list)
+
+    def embed(self, text: str, **kwargs) -> list:
+        return self.client.embed([text])[0]
+
+    async def aembed(self, text: str, **kwargs) -> list:
+        return (await self.aembed_batch([text]))[0]
+
+
+def register_graphrag_embedding_model():
+    """Serves the OpenAI-compatible GraphRAG embedding model types with BatchedEmbeddingModel."""
+    from graphrag.language_model.factory import ModelFactory
+
+    for model_type in _GRAPHRAG_MODEL_TYPES:
+        ModelFactory.register_embedding(model_type, lambda **kwargs: BatchedEmbeddingModel(**kwargs))
+
+
+def run_graphrag(args: list):
+    """Runs the GraphRAG CLI with the given arguments, embedding through the shared client."""
+    register_graphrag_embedding_model()
+
+    search_index_utils.register_graphrag_vector_store()
+
+    from graphrag.cli.main import app
+
+    try:
+        app(args, prog_name="graphrag")
+
+    finally:
+        for client in _clients.values():
+            print(f"Embeddings for {client.model}: {client.stats}")
+
+
+if __name__ == "__main__":
+    try:
+        run_graphrag(sys.argv[1:])
+
+    except Exception as e:
+
+        print(f"Error running GraphRAG: {e}")
+
+        traceback.print_exc()
+
+        sys.exit(1)
@@ -0,0 +1,474 @@
+##############################################################################
+# Incremental GraphRAG Indexing
+##############################################################################
+import os
+import sys
+import json
+import hashlib
+import subprocess
+import traceback
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute
+import upload_utils
+from github_tools import GithubTools
+
+_MANIFEST_FILE = "index_manifest.json"
+
+# Runs the GraphRAG CLI with the batched, cached embedding client.
+_GRAPHRAG_RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_utils.py")
+
+# GraphRAG output tables, keyed by their GraphRAG 2.x names; GraphRAG 0.x
+# names them create_final_<table>.parquet.
+_GRAPHRAG_TABLES = ["documents", "text_units", "entities", "relationships",
+                    "communities", "community_reports", "covariates"]
+
+
+##############################################################################
+# Manifest
+##############################################################################
+def get_index_manifest(graphrag_source_path: str) -> dict:
+    """
+    Returns the manifest of the last indexing run of the given GraphRAG
+    source path, or an empty manifest if the path has not been indexed yet.
+    The manifest records the indexed git SHA, the last successfully uploaded
+    git SHA, the content hash of each input document and the row hashes of
+    each uploaded LanceDB table.
+    """
+    path = os.path.join(graphrag_source_path, _MANIFEST_FILE)
+
+    if not os.path.exists(path):
+        return {"git_sha": None, "uploaded_sha": None, "documents": {}, "tables": {}}
+
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_index_manifest(graphrag_source_path: str, manifest: dict):
+    """Atomically saves the manifest of the GraphRAG source path."""
+    path = os.path.join(graphrag_source_path, _MANIFEST_FILE)
+
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def get_repo_sha(git_repo: str, branch: str = None) -> str:
+    """Returns the head SHA of the given branch (defaults to the default branch) of the git repo."""
+    repo_api = GithubTools.get_git_repo_api(git_repo)
+
+    branch = branch or repo_api.repos.get().default_branch
+
+    return repo_api.repos.get_branch(branch).commit.sha
+
+
+##############################################################################
+# Document Diff
+##############################################################################
+def get_document_hashes(input_path: str) -> dict:
+    """Returns the content hash of each GraphRAG input document, keyed by its path relative to the input path."""
+    hashes = {}
+
+    for root, _, files in os.walk(input_path):
+
+        for file_name in files:
+
+            file_path = os.path.join(root, file_name)
+
+            with open(file_path, "rb") as file:
+                hashes[os.path.relpath(file_path, input_path)] = hashlib.sha256(file.read()).hexdigest()
+
+    return hashes
+
+
+def diff_documents(previous: dict, current: dict):
+    """
+    Compares the document hashes of two indexing runs.
+    Returns:
+        The added, modified and deleted document titles.
+    """
+    added = sorted(set(current) - set(previous))
+
+    modified = sorted(title for title in set(current) & set(previous) if current[title] != previous[title])
+
+    deleted = sorted(set(previous) - set(current))
+
+    return added, modified, deleted
+
+
+##############################################################################
+# Index Update
+##############################################################################
+def _get_table_path(output_path: str, table_name: str):
+    for file_name in [f"{table_name}.parquet", f"create_final_{table_name}.parquet"]:
+
+        path = os.path.join(output_path, file_name)
+
+        if os.path.exists(path):
+            return path
+
+
+def _filter_ids(values, removed: set) -> list:
+    return [value for value in (values if values is not None else []) if value not in removed]
+
+
+def _has_any(values, ids: set) -> bool:
+    return bool(set(values if values is not None else []) & ids)
+
+
+def _load_graphrag_tables(output_path: str) -> dict:
+    return {name: pd.read_parquet(path) for name in _GRAPHRAG_TABLES
+            if (path := _get_table_path(output_path, name))}
+
+
+def get_stale_documents(output_path: str, document_titles: list) -> list:
+    """
+    Returns the documents which must be re-extracted when the given documents
+    are removed from a GraphRAG output. An entity or relationship which was
+    extracted from a removed document has a description summarized from it,
+    so it is removed entirely, and the other documents it was extracted from
+    are re-extracted; this repeats until no entity or relationship spans a
+    removed and a kept document.
+    Args:
+        output_path: The GraphRAG output path.
+        document_titles: The titles of the modified and deleted documents.
+    Returns:
+        The titles of the documents to remove, including the given documents.
+    """
+    tables = _load_graphrag_tables(output_path)
+
+    documents, text_units = tables["documents"], tables["text_units"]
+
+    document_of_text_unit = {text_unit_id: document_id
+                             for text_unit_id, document_ids in zip(text_units["id"], text_units["document_ids"])
+                             for document_id in (document_ids if document_ids is not None else [])}
+
+    removed_documents = set(documents.loc[documents["title"].isin(document_titles), "id"])
+
+    while True:
+        removed_text_units = {text_unit_id for text_unit_id, document_id in document_of_text_unit.items()
+                              if document_id in removed_documents}
+
+        entities = tables["entities"]
+
+        removed_entities = set(entities.loc[entities["text_unit_ids"].apply(
+            lambda ids: _has_any(ids, removed_text_units)), "title"])
+
+        relationships = tables["relationships"]
+
+        # A relationship is also removed with its source or target entity.
+        is_removed = (relationships["text_unit_ids"].apply(lambda ids: _has_any(ids, removed_text_units))
+                      | relationships["source"].isin(removed_entities)
+                      | relationships["target"].isin(removed_entities))
+
+        stale_documents = set(removed_documents)
+
+        for text_unit_ids in pd.concat([entities.loc[entities["title"].isin(removed_entities), "text_unit_ids"],
+                                        relationships.loc[is_removed, "text_unit_ids"]]):
+            stale_documents |= {document_of_text_unit[text_unit_id]
+                                for text_unit_id in (text_unit_ids if text_unit_ids is not None else [])
+                                if text_unit_id in document_of_text_unit}
+
+        if stale_documents == removed_documents:
+            return sorted(documents.loc[documents["id"].isin(removed_documents), "title"])
+
+        removed_documents = stale_documents
+
+
+def prune_graphrag_output(output_path: str, document_titles: list):
+    """
+    Removes the given documents from a GraphRAG output, along with their text
+    units and covariates, the entities and relationships extracted from them,
+    and the communities (and community reports) containing those entities or
+    relationships. The GraphRAG update command only adds new documents, so
+    modified and deleted documents are pruned before the update; the pruned
+    documents which still exist are then re-extracted as new documents.
+    Expand the documents with get_stale_documents first, so that no kept
+    entity or relationship loses a source.
+    Args:
+        output_path: The GraphRAG output path.
+        document_titles: The titles of the documents to remove.
+    """
+    tables = _load_graphrag_tables(output_path)
+
+    documents = tables["documents"]
+
+    removed_documents = set(documents.loc[documents["title"].isin(document_titles), "id"])
+
+    tables["documents"] = documents.loc[~documents["id"].isin(removed_documents)]
+
+    text_units = tables["text_units"]
+
+    is_removed = text_units["document_ids"].apply(lambda ids: _has_any(ids, removed_documents))
+
+    removed_text_units = set(text_units.loc[is_removed, "id"])
+
+    text_units = text_units.loc[~is_removed].copy()
+
+    entities = tables["entities"]
+
+    is_removed = entities["text_unit_ids"].apply(lambda ids: _has_any(ids, removed_text_units))
+
+    removed_entities = entities.loc[is_removed]
+
+    entities = entities.loc[~is_removed]
+
+    relationships = tables["relationships"]
+
+    is_removed = (relationships["text_unit_ids"].apply(lambda ids: _has_any(ids, removed_text_units))
+                  | relationships["source"].isin(removed_entities["title"])
+                  | relationships["target"].isin(removed_entities["title"]))
+
+    removed_relationships = set(relationships.loc[is_removed, "id"])
+
+    relationships = relationships.loc[~is_removed]
+
+    removed_entity_ids = set(removed_entities["id"])
+
+    for column, removed in [("entity_ids", removed_entity_ids), ("relationship_ids", removed_relationships)]:
+        if column in text_units:
+            text_units[column] = text_units[column].apply(lambda ids: _filter_ids(ids, removed))
+
+    tables.update(text_units=text_units, entities=entities, relationships=relationships)
+
+    if "covariates" in tables:
+        tables["covariates"] = tables["covariates"].loc[~tables["covariates"]["text_unit_id"].isin(removed_text_units)]
+
+    removed_communities = 0
+
+    if "communities" in tables:
+        communities = tables["communities"]
+
+        # A community report summarizes every entity and relationship of the
+        # community (and of its sub-communities, which the parent communities
+        # contain), so the communities which lost any of them are removed.
+        is_removed = communities["entity_ids"].apply(lambda ids: _has_any(ids, removed_entity_ids))
+
+        if "relationship_ids" in communities:
+            is_removed |= communities["relationship_ids"].apply(lambda ids: _has_any(ids, removed_relationships))
+
+        removed_communities = int(is_removed.sum())
+
+        communities = communities.loc[~is_removed].copy()
+
+        if "children" in communities:
+            kept = set(communities["community"])
+
+            communities["children"] = communities["children"].apply(
+                lambda ids: [child for child in (ids if ids is not None else []) if child in kept])
+
+        tables["communities"] = communities
+
+        if "community_reports" in tables:
+            reports = tables["community_reports"]
+
+            tables["community_reports"] = reports.loc[reports["community"].isin(communities["community"])]
+
+    for name, table in tables.items():
+        table.reset_index(drop=True).to_parquet(_get_table_path(output_path, name))
+
+    print(f"Pruned {len(removed_documents)} document(s), {len(removed_text_units)} text unit(s), "
+          f"{len(removed_entity_ids)} entities, {len(removed_relationships)} relationship(s) "
+          f"and {removed_communities} communities.")
+
+
+def _run_graphrag(command: str, graphrag_source_path: str, graph_rag_config_path: str):
+    result = subprocess.run([sys.executable, _GRAPHRAG_RUNNER, command,
+                             "--root", graphrag_source_path,
+                             "--config", graph_rag_config_path],
+                            capture_output=True, text=True, check=False)
+
+    print(f"\nSubprocess output: {result.stdout}")
+
+    if result.returncode != 0:
+
+        raise Exception(f"Error processing GraphRAG {command} command: {result.stderr}")
+
+
+def run_graphrag_index(graphrag_source_path: str, graph_rag_config_path: str):
+    """
+    Runs a full GraphRAG index. Texts are embedded through the embedding
+    cache, which later incremental updates reuse.
+    """
+    _run_graphrag("index", graphrag_source_path, graph_rag_config_path)
+
+
+def run_graphrag_update(graphrag_source_path: str, graph_rag_config_path: str):
+    """
+    Runs a GraphRAG incremental update, which extracts entities and
+    relationships only from the new input documents and merges them and
+    their communities into the existing output. Texts whose embeddings are
+    cached from previous runs are not re-embedded.
+    """
+    _run_graphrag("update", graphrag_source_path, graph_rag_config_path)
+
+
+##############################################################################
+# Changed Rows
+##############################################################################
+def _to_json_value(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    return str(value)
+
+
+def _get_vector_columns(schema: pa.Schema) -> list:
+    """Returns the embedding columns (lists of floats) of a table schema."""
+    return [field.name for field in schema
+            if (pa.types.is_list(field.type) or pa.types.is_large_list(field.type)
+                or pa.types.is_fixed_size_list(field.type))
+            and pa.types.is_floating(field.type.value_type)]
+
+
+def get_row_hashes(source, key_column: str = "id") -> dict:
+    """
+    Returns a content hash of each row of the table source, keyed by the key
+    column. The embedding columns are left out of the hashes, since they are
+    derived from the text columns. Rows are hashed batch by batch.
+    """
+    _, schema, get_batches = source
+
+    vector_columns = _get_vector_columns(schema)
+
+    hashes = {}
+
+    for batch in get_batches():
+
+        for record in batch.drop_columns(vector_columns).to_pylist():
+
+            hashes[str(record[key_column])] = hashlib.sha256(
+                json.dumps(record, sort_keys=True, default=_to_json_value).encode("utf-8")).hexdigest()
+
+    return hashes
+
+
+def push_changed_rows(db, table_name: str, source, previous_hashes: dict,
+                      manifest: upload_utils.UploadManifest, manifest_key: str,
+                      key_column: str = "id") -> dict:
+    """
+    Pushes only the new, changed and deleted rows of a table to LanceDB:
+    changed rows are upserted on the key column with merge_insert, so the
+    table and its indexes are kept. Tables without a key column, and tables
+    which were not uploaded before, are uploaded in full with upload_utils.
+    Args:
+        db: The LanceDB connection.
+        table_name: The table name.
+        source: The (signature, schema, batch iterator factory) of the table source.
+        previous_hashes: The row hashes of the last upload of the table.
+        manifest: The upload manifest.
+        manifest_key: The key of the table in the upload manifest.
+        key_column: The column which identifies a row.
+    Returns:
+        The row hashes of the uploaded table.
+    """
+    _, schema, get_batches = source
+
+    if key_column not in schema.names:
+
+        upload_utils.upload_table(db, table_name, source, manifest, manifest_key)
+
+        return {}
+
+    hashes = get_row_hashes(source, key_column)
+
+    if table_name not in db.table_names() or not previous_hashes:
+
+        upload_utils.upload_table(db, table_name, source, manifest, manifest_key)
+
+        return hashes
+
+    changed = {key for key, row_hash in hashes.items() if previous_hashes.get(key) != row_hash}
+
+    deleted = [key for key in previous_hashes if key not in hashes]
+
+    table = db.open_table(table_name)
+
+    if changed:
+        for batch in get_batches():
+
+            keys = pa.compute.cast(batch.column(key_column), pa.string())
+
+            batch = batch.filter(pa.compute.is_in(keys, value_set=pa.array(sorted(changed), pa.string())))
+
+            if batch.num_rows:
+                (table.merge_insert(key_column)
+                 .when_matched_update_all()
+                 .when_not_matched_insert_all()
+                 .execute(pa.Table.from_batches([batch], schema=schema)))
+
+    if deleted:
+        keys = ", ".join("'" + key.replace("'", "''") + "'" for key in deleted)
+
+        table.delete(f"{key_column} IN ({keys})")
+
+    print(f"{table_name}: {len(changed)} row(s) upserted, {len(deleted)} row(s) deleted.")
+
+    return hashes
+
+
+def update_graphrag_index(graphrag_source_path: str, graph_rag_config_path: str,
+                          git_sha: str = None) -> bool:
+    """
+    Incrementally updates the GraphRAG index of the given source path from
+    its (already refreshed) input documents. Falls back to a full index if
+    the source path has not been indexed yet.
+    Args:
+        graphrag_source_path: The source path used by the GraphRAG index configuration.
+        graph_rag_config_path: The GraphRAG configuration path.
+        git_sha: The git SHA of the indexed documents.
+    Returns:
+        True if the index was updated, False if nothing changed.
+    """
+    try:
+        manifest = get_index_manifest(graphrag_source_path)
+
+        output_path = os.path.join(graphrag_source_path, "output")
+
+        current = get_document_hashes(os.path.join(graphrag_source_path, "input"))
+
+        added, modified, deleted = diff_documents(manifest["documents"], current)
+
+        if not (added or modified or deleted):
+
+            print(f"No document changes since {manifest['git_sha']}; skipping indexing.")
+
+            manifest["git_sha"] = git_sha or manifest["git_sha"]
+
+            save_index_manifest(graphrag_source_path, manifest)
+
+            return False
+
+        print(f"Documents since {manifest['git_sha']}: {len(added)} added, "
+              f"{len(modified)} modified, {len(deleted)} deleted.")
+
+        if manifest["documents"] and _get_table_path(output_path, "documents"):
+
+            if modified or deleted:
+                stale = get_stale_documents(output_path, modified + deleted)
+
+                print(f"Pruning {len(stale)} document(s), including the documents which share "
+                      f"entities or relationships with the changed documents.")
+
+                prune_graphrag_output(output_path, stale)
+
+            run_graphrag_update(graphrag_source_path, graph_rag_config_path)
+
+        else:
+            run_graphrag_index(graphrag_source_path, graph_rag_config_path)
+
+        manifest.update(git_sha=git_sha, documents=current)
+
+        save_index_manifest(graphrag_source_path, manifest)
+
+        return True
+
+    except Exception as e:
+
+        print(f"Error processing incremental GraphRAG index: {e}")
+
+        traceback.print_exc()
+
+        raise
@@ -0,0 +1,197 @@
+##############################################################################
+# Local LanceDB Replicas
+##############################################################################
+import os
+import json
+import time
+import threading
+import traceback
+from urllib.parse import urlparse
+from minio import Minio
+from concurrent.futures import ThreadPoolExecutor
+
+_STATE_FILE = "replica_state.json"
+
+# Replicas older than this are re-synced in the background on the next read.
+_MAX_AGE_SECONDS = int(os.getenv("LANCEDB_REPLICA_MAX_AGE_SECONDS") or 300)
+
+_WORKERS = int(os.getenv("LANCEDB_REPLICA_WORKERS") or 8)
+
+# Lance manifests commit a version, so they are copied after the fragments,
+# deletion files and indexes they reference.
+_MANIFEST_DIRS = ("_versions/",)
+
+_MANIFEST_FILES = ("_latest.manifest",)
+
+
+def _is_manifest(object_name: str) -> bool:
+    return (any(f"/{path}" in object_name for path in _MANIFEST_DIRS)
+            or object_name.endswith(_MANIFEST_FILES))
+
+
+def get_minio_client(use_https: bool = True) -> Minio:
+    """Returns a Minio client for the AWS_S3_ENDPOINT object store."""
+    endpoint = os.getenv("AWS_S3_ENDPOINT")
+
+    parsed = urlparse(endpoint if "://" in endpoint else f"//{endpoint}")
+
+    return Minio(parsed.netloc,
+                 access_key=os.getenv("AWS_ACCESS_KEY_ID"),
+                 secret_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                 secure=parsed.scheme == "https" if parsed.scheme else use_https)
+
+
+##############################################################################
+# Replica
+##############################################################################
+class LanceDBReplica:
+    """
+    A local copy of a LanceDB database stored in MinIO. Lance data, deletion
+    and index files are immutable, so a sync only downloads the files which
+    were added since the last sync (the new fragments of each new version),
+    then the version manifests, so that readers never see a version whose
+    files are missing. GraphRAG queries read the replica by path, so there is
+    no fallback to the remote database: a query fails if the replica was
+    never synced and cannot be, and may lag the remote database by up to
+    LANCEDB_REPLICA_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self, bucket_name: str, lancedb_db_name: str, local_path: str, use_https: bool = True):
+        self.bucket_name = bucket_name
+        self.lancedb_db_name = lancedb_db_name
+        self.local_path = local_path
+        self.use_https = use_https
+        self._lock = threading.Lock()
+        self._sync_thread = None
+        self._state_path = os.path.join(local_path, _STATE_FILE)
+
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as file:
+                self.state = json.load(file)
+        else:
+            self.state = {"synced_at": None, "objects": {}}
+
+    def _save_state(self):
+        with open(f"{self._state_path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self.state, file)
+
+        os.replace(f"{self._state_path}.tmp", self._state_path)
+
+    def is_synced(self) -> bool:
+        """Returns whether the replica has been synced at least once."""
+        return self.state["synced_at"] is not None
+
+    def is_stale(self) -> bool:
+        """Returns whether the replica is older than LANCEDB_REPLICA_MAX_AGE_SECONDS."""
+        return not self.is_synced() or time.time() - self.state["synced_at"] > _MAX_AGE_SECONDS
+
+    def sync(self) -> int:
+        """
+        Downloads the objects of the remote database which are new or changed
+        since the last sync, and removes the local files which were deleted
+        remotely (ex. by a compaction).
+        Returns:
+            The number of downloaded objects.
+        """
+        with self._lock:
+            client = get_minio_client(self.use_https)
+
+            prefix = f"{self.lancedb_db_name}/"
+
+            remote = {item.object_name: item.etag
+                      for item in client.list_objects(self.bucket_name, prefix=prefix, recursive=True)
+                      if not item.is_dir}
+
+            objects = self.state["objects"]
+
+            changed = [name for name, etag in remote.items()
+                       if objects.get(name) != etag
+                       or not os.path.exists(os.path.join(self.local_path, name[len(prefix):]))]
+
+            def download(object_name: str):
+                client.fget_object(self.bucket_name, object_name,
+                                   os.path.join(self.local_path, object_name[len(prefix):]))
+
+                objects[object_name] = remote[object_name]
+
+            os.makedirs(self.local_path, exist_ok=True)
+
+            with ThreadPoolExecutor(max_workers=_WORKERS) as executor:
+                list(executor.map(download, [name for name in changed if not _is_manifest(name)]))
+
+            with ThreadPoolExecutor(max_workers=_WORKERS) as executor:
+                list(executor.map(download, [name for name in changed if _is_manifest(name)]))
+
+            for object_name in [name for name in objects if name not in remote]:
+
+                path = os.path.join(self.local_path, object_name[len(prefix):])
+
+                if os.path.exists(path):
+                    os.remove(path)
+
+                del objects[object_name]
+
+            self.state["synced_at"] = time.time()
+
+            self._save_state()
+
+            print(f"Synced {self.lancedb_db_name} to {self.local_path}: {len(changed)} object(s) downloaded.")
+
+            return len(changed)
+
+    def sync_in_background(self):
+        """Syncs the replica in a background thread, unless a sync is already running."""
+        if self._sync_thread and self._sync_thread.is_alive():
+            return
+
+        def run():
+            try:
+                self.sync()
+
+            except Exception as e:
+
+                print(f"Error syncing LanceDB replica {self.lancedb_db_name}: {e}")
+
+                traceback.print_exc()
+
+        self._sync_thread = threading.Thread(target=run, daemon=True)
+
+        self._sync_thread.start()
+
+    def ensure_synced(self):
+        """
+        Syncs the replica if it has never been synced; otherwise re-syncs it
+        in the background if it is stale, so that reads never wait for the
+        object store.
+        """
+        if not self.is_synced():
+            self.sync()
+
+        elif self.is_stale():
+            self.sync_in_background()
+
+
+_replicas = {}
+
+_replicas_lock = threading.Lock()
+
+
+def get_replica(bucket_name: str, lancedb_db_name: str, local_path: str = None,
+                use_https: bool = True) -> LanceDBReplica:
+    """
+    Returns the (shared) replica of a LanceDB database.
+    Args:
+        bucket_name: The bucket of the LanceDB database.
+        lancedb_db_name: The LanceDB database name.
+        local_path: The replica path. Defaults to local-lancedb/<lancedb_db_name>.
+        use_https: Whether https is used. Defaults to True.
+    """
+    local_path = local_path or os.path.join("local-lancedb", lancedb_db_name)
+
+    with _replicas_lock:
+        key = (bucket_name, lancedb_db_name, local_path)
+
+        if key not in _replicas:
+            _replicas[key] = LanceDBReplica(bucket_name, lancedb_db_name, local_path, use_https)
+
+        return _replicas[key]
@@ -0,0 +1,338 @@
+##############################################################################
+# LanceDB Search Indexes
+##############################################################################
+import os
+import math
+import time
+import random
+import traceback
+import numpy as np
+import pyarrow as pa
+
+# ANN index parameters; 0 selects a value from the table size and vector dimension.
+_VECTOR_INDEX_TYPE = os.getenv("LANCEDB_VECTOR_INDEX_TYPE", "IVF_PQ")
+
+_VECTOR_METRIC = os.getenv("LANCEDB_VECTOR_METRIC", "cosine")
+
+_NUM_PARTITIONS = int(os.getenv("LANCEDB_NUM_PARTITIONS") or 0)
+
+_NUM_SUB_VECTORS = int(os.getenv("LANCEDB_NUM_SUB_VECTORS") or 0)
+
+_HNSW_M = int(os.getenv("LANCEDB_HNSW_M") or 20)
+
+_HNSW_EF_CONSTRUCTION = int(os.getenv("LANCEDB_HNSW_EF_CONSTRUCTION") or 300)
+
+# Brute-force search is exact and fast enough below this number of rows.
+_ANN_MIN_ROWS = int(os.getenv("LANCEDB_ANN_MIN_ROWS") or 10_000)
+
+# Query-time ANN parameters of vector searches (see apply_query_params).
+_NPROBES = int(os.getenv("LANCEDB_NPROBES") or 20)
+
+_REFINE_FACTOR = int(os.getenv("LANCEDB_REFINE_FACTOR") or 0)
+
+_FTS_COLUMNS = os.getenv("LANCEDB_FTS_COLUMNS", "description,text,full_content,summary").split(",")
+
+_SCALAR_COLUMNS = os.getenv("LANCEDB_SCALAR_COLUMNS", "id,human_readable_id,title,community").split(",")
+
+
+##############################################################################
+# Index Creation
+##############################################################################
+def get_vector_columns(schema: pa.Schema) -> list:
+    """Returns the names of the embedding (fixed size float list) columns of a table."""
+    return [field.name for field in schema
+            if pa.types.is_fixed_size_list(field.type) and pa.types.is_floating(field.type.value_type)]
+
+
+def get_vector_index_params(num_rows: int, dimension: int) -> dict:
+    """
+    Returns the ANN index parameters of a vector column: about sqrt(rows)
+    IVF partitions and PQ sub-vectors of 16 dimensions (which must divide
+    the vector dimension), unless they are set explicitly.
+    """
+    num_partitions = _NUM_PARTITIONS or max(1, min(int(math.sqrt(num_rows)), num_rows // 256 or 1))
+
+    num_sub_vectors = _NUM_SUB_VECTORS or max(1, dimension // 16)
+
+    while dimension % num_sub_vectors:
+        num_sub_vectors -= 1
+
+    params = {"index_type": _VECTOR_INDEX_TYPE,
+              "metric": _VECTOR_METRIC,
+              "num_partitions": num_partitions,
+              "num_sub_vectors": num_sub_vectors}
+
+    if "HNSW" in _VECTOR_INDEX_TYPE:
+        params.update(m=_HNSW_M, ef_construction=_HNSW_EF_CONSTRUCTION)
+
+    return params
+
+
+def _normalize_index_type(index_type) -> str:
+    # LanceDB lists index types as ex. "IvfPq" and "BTree", and creates them from ex. "IVF_PQ" and "BTREE".
+    return str(index_type).replace("_", "").lower()
+
+
+def create_table_indexes(table, rebuild: bool = False) -> list:
+    """
+    Creates the ANN indexes of the embedding columns, the full-text indexes
+    of the text columns (LANCEDB_FTS_COLUMNS) and the scalar indexes of the
+    id columns (LANCEDB_SCALAR_COLUMNS) of a table. Existing indexes are
+    kept unless rebuild=True; rows added since they were built are indexed
+    by optimizing the table.
+    Args:
+        table: The LanceDB table.
+        rebuild: Whether to rebuild existing indexes. Defaults to False.
+    Returns:
+        The names of the indexed columns.
+    """
+    schema, num_rows = table.schema, table.count_rows()
+
+    indexed = {(column, _normalize_index_type(index.index_type))
+               for index in table.list_indices() for column in index.columns}
+
+    created, kept = [], False
+
+    def should_create(column: str, index_type: str) -> bool:
+        nonlocal kept
+
+        # An index of another type (ex. IVF_PQ after switching to IVF_HNSW_SQ) is replaced.
+        if (column, _normalize_index_type(index_type)) in indexed and not rebuild:
+            kept = True
+
+            return False
+
+        return True
+
+    for column in get_vector_columns(schema):
+
+        if num_rows < _ANN_MIN_ROWS:
+
+            print(f"Skipping ANN index on {table.name}.{column} ({num_rows} rows).")
+
+            continue
+
+        if should_create(column, _VECTOR_INDEX_TYPE):
+
+            params = get_vector_index_params(num_rows, schema.field(column).type.list_size)
+
+            print(f"Creating {params['index_type']} index on {table.name}.{column}: {params}")
+
+            table.create_index(vector_column_name=column, replace=True, **params)
+
+            created.append(column)
+
+    for column in _FTS_COLUMNS:
+
+        if column in schema.names and pa.types.is_string(schema.field(column).type) and should_create(column, "FTS"):
+
+            table.create_fts_index(column, replace=True)
+
+            created.append(column)
+
+    for column in _SCALAR_COLUMNS:
+
+        if column in schema.names and should_create(column, "BTREE"):
+
+            table.create_scalar_index(column, index_type="BTREE", replace=True)
+
+            created.append(column)
+
+    if kept:
+        table.optimize()
+
+    return created
+
+
+def create_search_indexes(db, rebuild: bool = False) -> dict:
+    """
+    Creates the search indexes of every table of a LanceDB database.
+    Args:
+        db: The LanceDB connection.
+        rebuild: Whether to rebuild existing indexes. Defaults to False.
+    Returns:
+        The indexed columns of each table.
+    """
+    results = {}
+
+    for table_name in db.table_names():
+
+        try:
+            results[table_name] = create_table_indexes(db.open_table(table_name), rebuild=rebuild)
+
+            print(f"{table_name}: indexed {results[table_name]}.")
+
+        except Exception as e:
+
+            print(f"Error creating indexes for {table_name}: {e}")
+
+            traceback.print_exc()
+
+    return results
+
+
+##############################################################################
+# Queries
+##############################################################################
+def apply_query_params(query, nprobes: int = _NPROBES, refine_factor: int = _REFINE_FACTOR):
+    """
+    Applies the tuned ANN parameters (LANCEDB_NPROBES, LANCEDB_REFINE_FACTOR)
+    to a LanceDB vector query. Queries of other kinds are returned unchanged.
+    """
+    if not hasattr(query, "nprobes"):
+        return query
+
+    query = query.nprobes(nprobes)
+
+    return query.refine_factor(refine_factor) if refine_factor else query
+
+
+class _TunedTable:
+    """Proxies a LanceDB table, applying the tuned ANN parameters to its vector searches."""
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getattr__(self, name):
+        return getattr(self._table, name)
+
+    def search(self, query=None, *args, **kwargs):
+        search = self._table.search(query, *args, **kwargs)
+
+        return apply_query_params(search) if query is not None else search
+
+
+def register_graphrag_vector_store():
+    """
+    Serves GraphRAG's LanceDB vector store with the tuned ANN parameters, so
+    that GraphRAG's vector searches (local and DRIFT search) use
+    LANCEDB_NPROBES and LANCEDB_REFINE_FACTOR. Global search reads the
+    community reports without a vector search and is not affected.
+    """
+    from graphrag.vector_stores import factory
+    from graphrag.vector_stores.lancedb import LanceDBVectorStore
+
+    class TunedLanceDBVectorStore(LanceDBVectorStore):
+
+        @property
+        def document_collection(self):
+            return self.__dict__.get("_tuned_collection")
+
+        @document_collection.setter
+        def document_collection(self, table):
+            self.__dict__["_tuned_collection"] = _TunedTable(table) if table is not None else None
+
+    factory.VectorStoreFactory.register(factory.VectorStoreType.LanceDB.value, TunedLanceDBVectorStore)
+
+    # GraphRAG 2.x matches the built-in LanceDB type before the registered
+    # types, and creates it by its module-level name.
+    factory.LanceDBVectorStore = TunedLanceDBVectorStore
+
+
+##############################################################################
+# Benchmark
+##############################################################################
+def benchmark_vector_index(table, vector_column: str = None, k: int = 10,
+                           num_queries: int = 50, nprobes: list = None,
+                           refine_factor: int = _REFINE_FACTOR, key_column: str = "id") -> list:
+    """
+    Measures the recall@k and latency of the ANN index of a table against
+    exact (brute-force) search, using vectors sampled from the table as
+    queries.
+    Args:
+        table: The LanceDB table.
+        vector_column: The vector column. Defaults to the first embedding column.
+        k: The number of neighbors to retrieve.
+        num_queries: The number of sampled queries.
+        nprobes: The nprobes values to evaluate. Defaults to [LANCEDB_NPROBES].
+        refine_factor: The refine factor of the ANN search (0 disables refinement).
+        key_column: The column which identifies a row; recall compares the retrieved keys.
+    Returns:
+        The recall and p50/p95 latencies of exact search and of each nprobes value.
+    """
+    vector_column = vector_column or get_vector_columns(table.schema)[0]
+
+    if key_column not in table.schema.names:
+        raise ValueError(f"{table.name} has no '{key_column}' column to measure recall with.")
+
+    sample = table.to_lance().take(sorted(random.sample(range(table.count_rows()),
+                                                         min(num_queries, table.count_rows()))),
+                                   columns=[vector_column])
+
+    queries = sample.column(vector_column).to_numpy(zero_copy_only=False)
+
+    def run(configure) -> tuple:
+        results, latencies = [], []
+
+        for query in queries:
+            search = configure(table.search(np.asarray(query), vector_column_name=vector_column)
+                               .metric(_VECTOR_METRIC).limit(k))
+
+            start = time.perf_counter()
+
+            rows = search.to_arrow()
+
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            results.append(set(rows.column(key_column).to_pylist()))
+
+        return results, latencies
+
+    exact, latencies = run(lambda search: search.bypass_vector_index())
+
+    report = [{"search": "exact", "recall": 1.0,
+               "p50_ms": float(np.percentile(latencies, 50)),
+               "p95_ms": float(np.percentile(latencies, 95))}]
+
+    for value in nprobes or [_NPROBES]:
+
+        approximate, latencies = run(lambda search, value=value: apply_query_params(search, value, refine_factor))
+
+        recall = np.mean([len(found & expected) / max(len(expected), 1)
+                          for found, expected in zip(approximate, exact)])
+
+        report.append({"search": f"ann(nprobes={value}, refine_factor={refine_factor})",
+                       "recall": float(recall),
+                       "p50_ms": float(np.percentile(latencies, 50)),
+                       "p95_ms": float(np.percentile(latencies, 95))})
+
+    for row in report:
+        print(f"{table.name}.{vector_column} {row['search']}: recall@{k}={row['recall']:.3f}, "
+              f"p50={row['p50_ms']:.1f}ms, p95={row['p95_ms']:.1f}ms")
+
+    return report
+
+
+def benchmark_search_indexes(db, k: int = 10, num_queries: int = 50, nprobes: list = None) -> dict:
+    """
+    Benchmarks the ANN indexes of every indexed embedding table of a LanceDB database.
+    Args:
+        db: The LanceDB connection.
+        k: The number of neighbors to retrieve.
+        num_queries: The number of sampled queries per table.
+        nprobes: The nprobes values to evaluate. Defaults to [LANCEDB_NPROBES].
+    Returns:
+        The benchmark report of each vector column, keyed by "table.column".
+    """
+    reports = {}
+
+    for table_name in db.table_names():
+
+        table = db.open_table(table_name)
+
+        indexed = {column for index in table.list_indices() for column in index.columns}
+
+        if "id" not in table.schema.names:
+
+            print(f"Skipping {table_name} (no id column to measure recall with).")
+
+            continue
+
+        for column in get_vector_columns(table.schema):
+
+            if column in indexed:
+                reports[f"{table_name}.{column}"] = benchmark_vector_index(table, column, k=k,
+                                                                           num_queries=num_queries,
+                                                                           nprobes=nprobes)
+
+    return reports
@@ -0,0 +1,233 @@
+##############################################################################
+# Bulk LanceDB Upload
+##############################################################################
+import os
+import json
+import time
+import threading
+import traceback
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+_MANIFEST_FILE = "upload_manifest.json"
+
+_BATCH_ROWS = int(os.getenv("LANCEDB_UPLOAD_BATCH_ROWS") or 100_000)
+
+_WORKERS = int(os.getenv("LANCEDB_UPLOAD_WORKERS") or 4)
+
+_MAX_RETRIES = int(os.getenv("LANCEDB_UPLOAD_MAX_RETRIES") or 5)
+
+
+##############################################################################
+# Manifest
+##############################################################################
+class UploadManifest:
+    """
+    Tracks the upload progress of each table, so that an interrupted upload
+    resumes from the last committed batch. Progress is saved after every
+    batch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self.tables = json.load(file)
+        else:
+            self.tables = {}
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            return dict(self.tables.get(key, {}))
+
+    def set(self, key: str, **progress):
+        with self._lock:
+            self.tables.setdefault(key, {}).update(progress)
+
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as file:
+                json.dump(self.tables, file, indent=2)
+
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+def get_upload_manifest(manifest_dir: str) -> UploadManifest:
+    """Returns the upload manifest kept in the given directory."""
+    return UploadManifest(os.path.join(manifest_dir, _MANIFEST_FILE))
+
+
+##############################################################################
+# Sources
+##############################################################################
+def get_parquet_source(file_path: str):
+    """
+    Returns the (signature, schema, batch iterator factory) of a parquet file.
+    Batches are streamed as Arrow record batches without loading the file.
+    """
+    stat = os.stat(file_path)
+
+    parquet_file = pq.ParquetFile(file_path)
+
+    return (f"{stat.st_size}-{stat.st_mtime_ns}",
+            parquet_file.schema_arrow,
+            lambda: pq.ParquetFile(file_path).iter_batches(batch_size=_BATCH_ROWS))
+
+
+def get_lance_source(local_table):
+    """Returns the (signature, schema, batch iterator factory) of a local LanceDB table."""
+    dataset = local_table.to_lance()
+
+    return (f"{dataset.uri}-{dataset.version}",
+            dataset.schema,
+            lambda: dataset.to_batches(batch_size=_BATCH_ROWS))
+
+
+##############################################################################
+# Upload
+##############################################################################
+def _with_retries(description: str, function):
+    for attempt in range(1, _MAX_RETRIES + 1):
+        try:
+            return function()
+
+        except Exception as e:
+            if attempt == _MAX_RETRIES:
+                raise
+
+            delay = min(2 ** attempt, 60)
+
+            print(f"{description} failed (attempt {attempt}/{_MAX_RETRIES}): {e}; retrying in {delay}s...")
+
+            time.sleep(delay)
+
+
+def upload_table(db, table_name: str, source, manifest: UploadManifest, manifest_key: str) -> int:
+    """
+    Uploads a table batch by batch, resuming after the last committed batch.
+    Each batch is appended as one commit and recorded in the manifest. The
+    committed row count of the remote table is checked before each append, so
+    retried batches are neither lost nor duplicated.
+    Args:
+        db: The LanceDB connection.
+        table_name: The table name.
+        source: The (signature, schema, batch iterator factory) of the table source.
+        manifest: The upload manifest.
+        manifest_key: The key of the table in the manifest.
+    Returns:
+        The number of uploaded rows.
+    """
+    signature, schema, get_batches = source
+
+    progress = manifest.get(manifest_key)
+
+    if progress.get("signature") == signature and progress.get("status") == "complete":
+
+        print(f"{table_name} is already uploaded.")
+
+        return progress["rows"]
+
+    if progress.get("signature") == signature and table_name in db.table_names():
+
+        table = db.open_table(table_name)
+
+        rows = _with_retries(f"Counting {table_name}", table.count_rows)
+
+        print(f"Resuming {table_name} after {rows} row(s)...")
+
+    else:
+        table = _with_retries(f"Creating {table_name}",
+                              lambda: db.create_table(table_name, schema=schema, mode="overwrite"))
+
+        rows = 0
+
+    manifest.set(manifest_key, signature=signature, status="in_progress", rows=rows)
+
+    skipped = 0
+
+    for batch in get_batches():
+
+        # Skip the batches which were committed before the last failure.
+        if skipped + batch.num_rows <= rows:
+
+            skipped += batch.num_rows
+
+            continue
+
+        if skipped < rows:
+
+            batch = batch.slice(rows - skipped)
+
+            skipped = rows
+
+        expected_rows = rows + batch.num_rows
+
+        def append():
+            # A failed attempt may have been committed before the connection dropped.
+            committed = table.count_rows()
+
+            if committed == expected_rows:
+                return
+
+            if committed != rows:
+                raise Exception(f"{table_name} has {committed} row(s), expected {rows}")
+
+            table.add(pa.Table.from_batches([batch], schema=schema))
+
+        _with_retries(f"Uploading {table_name}", append)
+
+        rows = skipped = expected_rows
+
+        manifest.set(manifest_key, rows=rows)
+
+    manifest.set(manifest_key, status="complete", rows=rows)
+
+    print(f"{table_name} uploaded ({rows} rows).")
+
+    return rows
+
+
+def upload_tables(db, lancedb_db_name: str, sources: dict, manifest_dir: str) -> dict:
+    """
+    Uploads several tables in parallel with a pool of LANCEDB_UPLOAD_WORKERS
+    workers, streaming LANCEDB_UPLOAD_BATCH_ROWS rows per batch.
+    Args:
+        db: The LanceDB connection.
+        lancedb_db_name: The LanceDB database name (used to key the manifest).
+        sources: The source of each table, keyed by table name.
+        manifest_dir: The directory of the upload manifest.
+    Returns:
+        The number of uploaded rows of each table (None for failed tables).
+    """
+    manifest = get_upload_manifest(manifest_dir)
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=_WORKERS) as executor:
+
+        futures = {executor.submit(upload_table, db, table_name, source, manifest,
+                                   f"{lancedb_db_name}/{table_name}"): table_name
+                   for table_name, source in sources.items()}
+
+        for future in as_completed(futures):
+
+            table_name = futures[future]
+
+            try:
+                results[table_name] = future.result()
+
+            except Exception as e:
+
+                print(f"Error uploading {table_name} to LanceDB: {e}")
+
+                traceback.print_exc()
+
+                results[table_name] = None
+
+    failed = [table_name for table_name, rows in results.items() if rows is None]
+
+    if failed:
+        print(f"{len(failed)} table(s) failed: {failed}. Run the upload again to resume them.")
+
+    return results
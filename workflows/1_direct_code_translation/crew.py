@@ -9,7 +9,8 @@ from typing import List
 from crewai_tools import SerperDevTool, DirectoryReadTool, FileWriterTool
 from crewai.tools import tool
 import os
-from tools import github_util, file_tools
+from tools import github_util, file_tools, code_search_tools
+from llms import llm_registry
 from data_models.data_models import UserStory, UserStoryList, DocumentDetails
 import logging
 from dotenv import load_dotenv
@@ -20,23 +21,17 @@ load_dotenv()
 ##############################################################################
 
 def get_selected_model(model_prefix: str):
+    """Returns the shared LLM for the given model prefix."""
 
-    llm = LLM(
+    return llm_registry.get_llm(
 
-        model=os.getenv(f'{model_prefix}_LLM_PROVIDER') + "/" +
-              os.getenv(f'{model_prefix}_LLM_ID'),
-
-        api_key=os.getenv(f'{model_prefix}_LLM_TOKEN'),
-
-        base_url=os.getenv(f'{model_prefix}_LLM_API_BASE'),
+        model_prefix,
 
         max_tokens=128_000,
 
         temperature=0,
     )
 
-    return llm
-
 @CrewBase
 class DirectCodeTranslationCycle():
     """
@@ -66,7 +61,10 @@ class DirectCodeTranslationCycle():
             config=self.agents_config["coder"],
             llm=get_selected_model(self.selected_model),
             tools=[file_tools.read_files_by_pattern,
-                   file_tools.read_file_by_name],
+                   file_tools.read_file_by_name,
+                   code_search_tools.search_code,
+                   code_search_tools.find_symbol,
+                   code_search_tools.read_code_snippet],
             result_as_answer=True,
         )
 
@@ -0,0 +1,138 @@
+"""Compact transport of data models between crews.
+
+Models are passed to the next crew as prompt context. Instead of inlining
+the full ``json.dumps(model.model_dump())``, the compact form:
+
+- omits fields which still have their default values,
+- stores lists of rows with the same fields (ex. ``EvalDetails.data``) as
+  ``{"$columns": [...], "$rows": [[...], ...]}``, so the field names are not
+  repeated for every row,
+- in reference mode, moves values larger than CONTEXT_INLINE_MAX_BYTES to
+  content-addressed files under CONTEXT_STORE_DIR and passes
+  ``{"$ref": <path>, "bytes": <size>}`` in their place. Strings are stored
+  as plain text, other values as JSON.
+
+Serialization uses orjson with sorted keys, so identical models always
+produce identical context.
+"""
+
+import os
+import hashlib
+import logging
+import orjson
+from pydantic import BaseModel
+from typing import Any, Optional, Type
+
+logging.basicConfig(level=logging.INFO)
+
+_INLINE_MAX_BYTES = int(os.getenv("CONTEXT_INLINE_MAX_BYTES") or 4096)
+
+_STORE_DIR = os.getenv("CONTEXT_STORE_DIR", ".context_store")
+
+
+def to_compact(value: Any) -> Any:
+    """Converts a model (or a dumped model) to its compact form."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(exclude_defaults=True)
+
+    if isinstance(value, dict):
+        return {key: to_compact(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        items = [to_compact(item) for item in value]
+
+        if len(items) > 1 and all(isinstance(item, dict) for item in items):
+            columns = sorted({key for item in items for key in item})
+
+            return {"$columns": columns,
+                    "$rows": [[item.get(column) for column in columns] for item in items]}
+
+        return items
+
+    return value
+
+
+def from_compact(value: Any) -> Any:
+    """Converts a compact form back to plain values, loading referenced values."""
+    if isinstance(value, dict):
+        if "$ref" in value:
+            return from_compact(load_reference(value["$ref"]))
+
+        if "$columns" in value and "$rows" in value:
+            return [{column: from_compact(item) for column, item in zip(value["$columns"], row)
+                     if item is not None}
+                    for row in value["$rows"]]
+
+        return {key: from_compact(item) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [from_compact(item) for item in value]
+
+    return value
+
+
+def dumps_context(model: Any, reference_mode: bool = True) -> str:
+    """
+    Serializes a model as compact prompt context.
+    :param model: The model (or a dumped model).
+    :param reference_mode: Whether large values are passed by reference.
+    :return: The context as a JSON string.
+    """
+    compact = to_compact(model)
+
+    if reference_mode:
+        compact = _offload(compact)
+
+    return orjson.dumps(compact, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+
+def loads_context(context: str, model_class: Optional[Type[BaseModel]] = None) -> Any:
+    """
+    Deserializes prompt context written by dumps_context.
+    :param context: The context as a JSON string.
+    :param model_class: (Optional) The model to validate the context with.
+    :return: The model, or the plain values if no model class is given.
+    """
+    value = from_compact(orjson.loads(context))
+
+    return model_class.model_validate(value) if model_class else value
+
+
+def store_reference(value: Any) -> dict:
+    """Stores a value in the content-addressed context store and returns its reference."""
+    is_text = isinstance(value, str)
+
+    data = value.encode("utf-8") if is_text else orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+    path = os.path.join(_STORE_DIR, f"{hashlib.sha256(data).hexdigest()}.{'txt' if is_text else 'json'}")
+
+    if not os.path.exists(path):
+        os.makedirs(_STORE_DIR, exist_ok=True)
+
+        with open(f"{path}.tmp", "wb") as file:
+            file.write(data)
+
+        os.replace(f"{path}.tmp", path)
+
+    return {"$ref": path, "bytes": len(data)}
+
+
+def load_reference(path: str) -> Any:
+    """Loads a value from the context store."""
+    with open(path, "rb") as file:
+        data = file.read()
+
+    return data.decode("utf-8") if path.endswith(".txt") else orjson.loads(data)
+
+
+def _offload(value: Any) -> Any:
+    if isinstance(value, dict) and "$columns" not in value:
+        return {key: _offload(item) for key, item in value.items()}
+
+    if isinstance(value, (str, list, dict)):
+        size = len(value.encode("utf-8")) if isinstance(value, str) else len(orjson.dumps(value))
+
+        if size > _INLINE_MAX_BYTES:
+            return store_reference(value)
+
+    return value
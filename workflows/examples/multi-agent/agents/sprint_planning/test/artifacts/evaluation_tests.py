@@ -1,45 +1,117 @@
+"""
+Evaluation threshold gate. Checks every score of every row of the evaluation
+results against the threshold of its metric, and reports one test per
+failing row. Only needs pytest (and pyarrow for Parquet results):
+
+    pytest evaluation_tests.py
+
+The results path and thresholds are read from the --evaluation_data,
+--evaluation_threshold and --evaluation_thresholds options when they are
+registered (ex. by tools.unittest_util), else from the EVALUATION_DATA,
+EVALUATION_THRESHOLD and EVALUATION_THRESHOLDS environment variables.
+"""
 import pytest
 import csv
 import os
+import json
+import math
 import logging
 logging.basicConfig(level=logging.INFO)
 
-def pytest_addoption(parser):
-    parser.addoption(
-        "--evaluation_data",
-        action="store",
-        default="./spec/tmp/evaluation_data.csv",
-        help='Specify evaluation data file path.'
-    )
-
-    parser.addoption(
-        "--evaluation_threshold",
-        action="store",
-        default=0.7,
-        help='Specify evaluation threshold.'
-    )
-
-@pytest.fixture
-def evaluation_data(request):
-    return request.config.getoption("--evaluation_data")
-
-@pytest.fixture
-def evaluation_threshold(request):
-    return request.config.getoption("--evaluation_threshold")
-
-def test_csv_row_data(evaluation_data, evaluation_threshold):
+_DEFAULT_SETTINGS = {"evaluation_data": "./spec/tmp/evaluation_data.csv",
+                     "evaluation_threshold": 0.7,
+                     "evaluation_thresholds": "{}"}
+
+# The default passing score of the reference-based metrics, which score
+# lower than the judge metrics for equally good answers. Other metrics (ex.
+# the judge relevancy) use the evaluation threshold.
+_METRIC_THRESHOLDS = {"bleu4_score": 0.3,
+                      "rougel_score": 0.4,
+                      "meteor_score": 0.4,
+                      "bert_score": 0.85}
+
+def get_setting(config, name: str):
+    """Returns an evaluation setting from its option, environment variable or default."""
+    value = config.getoption(f"--{name}", default=None)
+
+    return value if value is not None else os.getenv(name.upper(), _DEFAULT_SETTINGS[name])
+
+def _to_score(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def load_score_columns(evaluation_data: str):
     """
-    Evaluate the relevancy score of given rows and asserts that it meets a specified threshold.
+    Loads the score columns of the given evaluation results. Supports CSV
+    files and Parquet files or directories.
+    :param evaluation_data: Path to the evaluation results.
+    :return: The score column names and the score rows (missing scores are NaN).
     """
-    with open(evaluation_data, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    if evaluation_data.endswith(".csv"):
+        with open(evaluation_data, 'r', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+
+            columns = {name: [] for name in reader.fieldnames or []}
+
+            for row in reader:
+                for name in columns:
+                    columns[name].append(row.get(name))
+    else:
+        import pyarrow.parquet as pq
 
-        rows = [row for row in reader]
+        columns = pq.read_table(evaluation_data).to_pydict()
 
-        for row in rows:
+    names = [name for name in columns if name.endswith("_score") or name.startswith("eval_scores_")]
 
-            if 'eval_scores_relevancy' in row:
+    rows = [[_to_score(value) for value in values]
+            for values in zip(*(columns[name] for name in names))]
 
-                assert (row['eval_scores_relevancy'] >= int(evaluation_threshold))
+    return names, rows
+
+def find_failing_rows(evaluation_data: str, threshold: float, metric_thresholds: dict = None):
+    """
+    Checks every score of every row against the threshold of its metric.
+    Missing scores count as failures.
+    :param evaluation_data: Path to the evaluation results.
+    :param threshold: The passing score of the metrics without their own threshold.
+    :param metric_thresholds: (Optional) The passing score of each metric, by
+    score column name; overrides the defaults of the reference-based metrics.
+    :return: The (row, {metric: score}) pairs of the rows with failing scores.
+    """
+    names, rows = load_score_columns(evaluation_data)
 
-    assert True
\ No newline at end of file
+    thresholds = {**_METRIC_THRESHOLDS, **(metric_thresholds or {})}
+
+    cutoffs = [float(thresholds.get(name, threshold)) for name in names]
+
+    failures = []
+
+    for index, scores in enumerate(rows):
+        failing = {name: score for name, score, cutoff in zip(names, scores, cutoffs)
+                   if not score >= cutoff}
+
+        if failing:
+            failures.append((index, failing))
+
+    return failures
+
+def pytest_generate_tests(metafunc):
+    """Generates one failing_row parameter per failing row (or one passing parameter)."""
+    if "failing_row" in metafunc.fixturenames:
+        config = metafunc.config
+
+        failures = find_failing_rows(get_setting(config, "evaluation_data"),
+                                     float(get_setting(config, "evaluation_threshold")),
+                                     json.loads(get_setting(config, "evaluation_thresholds")))
+
+        metafunc.parametrize("failing_row", failures or [None],
+                             ids=[f"row-{row}" for row, _ in failures] or ["all-rows"])
+
+def test_evaluation_scores(failing_row):
+    """
+    Asserts that every evaluation score of every row meets the threshold of its metric.
+    """
+    assert failing_row is None, (f"Row {failing_row[0]} is below the evaluation cutoff: "
+                                 f"{failing_row[1]}")
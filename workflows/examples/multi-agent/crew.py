@@ -10,12 +10,19 @@ from crewai_tools import (SerperDevTool, DirectoryReadTool, FileWriterTool,
                           FileReadTool)
 from crewai.tools import tool
 import os
-from tools import github_util, file_tools, evaluation_tools
+from tools import github_util, file_tools, evaluation_tools, code_search_tools
+from llms import llm_registry
+from tasks.deterministic_task import DeterministicTask
 from data_models.data_models import (UserStory, UserStoryList, DocDetails,
                                      EvalDetails, AggregateDetails)
+from data_models import transport
+from crewai.crews.crew_output import CrewOutput
 import inspect
 from pydantic import BaseModel
 import logging
+import traceback
+import queue
+import threading
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -24,15 +31,11 @@ load_dotenv()
 ##############################################################################
 
 def get_selected_model(model_prefix: str):
+    """Returns the shared LLM for the given model prefix."""
 
-    llm = LLM(
+    return llm_registry.get_llm(
 
-        model=os.getenv(f'{model_prefix}_LLM_PROVIDER') + "/" +
-              os.getenv(f'{model_prefix}_LLM_ID'),
-
-        api_key=os.getenv(f'{model_prefix}_LLM_TOKEN'),
-
-        base_url=os.getenv(f'{model_prefix}_LLM_API_BASE'),
+        model_prefix,
 
         max_tokens=256_000,
 
@@ -42,8 +45,6 @@ def get_selected_model(model_prefix: str):
 
     )
 
-    return llm
-
 @CrewBase
 class ReleaseCycle():
     """
@@ -156,6 +157,10 @@ class SprintCycle:
             tools=[file_tools.read_files_by_pattern,
                    file_tools.read_file_by_name,
                    file_tools.query_json_string,
+                   file_tools.query_json_string_paths,
+                   code_search_tools.search_code,
+                   code_search_tools.find_symbol,
+                   code_search_tools.read_code_snippet,
                    self.file_writer_tool,
                    self.file_reader_tool,],
             result_as_answer=True,
@@ -172,6 +177,11 @@ class SprintCycle:
             tools=[file_tools.read_files_by_pattern,
                    file_tools.read_file_by_name,
                    file_tools.query_json_string,
+                   file_tools.query_json_string_paths,
+                   code_search_tools.search_code,
+                   code_search_tools.find_symbol,
+                   code_search_tools.read_code_snippet,
+                   evaluation_tools.read_evaluation_results,
                    self.file_writer_tool,
                    self.file_reader_tool,],
             result_as_answer=True,
@@ -195,6 +205,7 @@ class SprintCycle:
             llm=get_selected_model(self.selected_model),
             tools=[file_tools.read_file_by_name,
                    file_tools.query_json_string,
+                   file_tools.query_json_string_paths,
                    self.file_writer_tool,
                    self.file_reader_tool,
                    evaluation_tools.get_llm_as_judge_evaluation_scores],
@@ -217,32 +228,32 @@ class SprintCycle:
 
     @task
     def plan(self) -> Task:
-        return Task(
+        return DeterministicTask(
             config=self.tasks_config["plan"],
             output_pydantic=self.data_type,
         )
 
     @task
     def pre_build(self) -> Task:
-        return Task(
+        return DeterministicTask(
             config=self.tasks_config["pre_build"],
         )
 
     @task
     def build(self) -> Task:
-        return Task(
+        return DeterministicTask(
             config=self.tasks_config["build"],
         )
 
     @task
     def reflect(self) -> Task:
-        return Task(
+        return DeterministicTask(
             config=self.tasks_config["reflect"],
         )
 
     @task
     def post_build(self) -> Task:
-        return Task(
+        return DeterministicTask(
             config=self.tasks_config["post_build"],
             output_pydantic=AggregateDetails,
         )
@@ -258,3 +269,194 @@ class SprintCycle:
             verbose=True,
             cache=False,
         )
+
+
+##############################################################################
+# Pipelines
+##############################################################################
+
+_PIPELINE_STOP = object()
+
+class SprintPipeline:
+    """
+    Runs the SprintCycle categories for a stream of issues as a pipeline.
+
+    Each category (ex. "doc", "eval") is a stage with its own worker thread.
+    Every finished artifact of a stage (ex. each completed DocDetails) is
+    handed to the next stage as soon as its task produces it, and the stage
+    moves on to the next issue once its crew finishes. This lets the "doc"
+    phase of the next issue overlap the "eval" phase of the current one, so
+    the time per issue approaches the slowest stage instead of the sum of all
+    stages.
+
+    The worker threads are started by the first submitted issue.
+    on_issue_done(issue, succeeded) is called once all the artifacts of an
+    issue have gone through the last stage.
+    """
+
+    def __init__(self, feature: str, selected_model: str,
+                 categories: List[str], output_base_path: str,
+                 on_issue_done=None):
+        self.feature = feature
+        self.selected_model = selected_model
+        self.categories = list(categories)
+        self.output_base_path = output_base_path
+        self.on_issue_done = on_issue_done
+        self.results = {}
+        self._queues = [queue.Queue() for _ in self.categories]
+        self._workers = []
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._failed = set()
+        self._first_stage_items = 0
+
+    def start(self):
+        """Starts the stage workers, unless they are already running."""
+        with self._lock:
+            if self._workers:
+                return
+
+            self._workers = [threading.Thread(target=self._run_stage,
+                                              args=(index,),
+                                              name=f"sprint-{category}",
+                                              daemon=True)
+                             for index, category in enumerate(self.categories)]
+            for worker in self._workers:
+                worker.start()
+
+    def submit(self, issue: dict):
+        """Queues an issue for the first stage of the pipeline."""
+        logging.info(f"Queueing issue #{issue['number']} for sprint pipeline...")
+
+        self.start()
+
+        with self._lock:
+            self._pending[issue["number"]] = 1
+            self._first_stage_items += 1
+
+        self._queues[0].put((issue, None))
+
+    def has_capacity(self) -> bool:
+        """Returns whether the first stage is free to start another issue."""
+        with self._lock:
+            return self._first_stage_items == 0
+
+    def in_flight(self) -> int:
+        """Returns the number of submitted issues which have not finished every stage."""
+        with self._lock:
+            return len(self._pending)
+
+    def run_category(self, category: str, issue: dict,
+                     context: BaseModel = None, emit=None) -> CrewOutput:
+        """
+        Runs a single SprintCycle category for the given issue.
+        :param category: The task category.
+        :param issue: The issue.
+        :param context: (Optional) The artifact of the previous stage.
+        :param emit: (Optional) Called with each finished artifact as soon as its task produces it.
+        :return: The crew output.
+        """
+        additional_context = transport.dumps_context(context) if context else "{}"
+
+        logging.info(f"Additional context ({len(additional_context)} chars): {additional_context[:500]}")
+
+        crew = SprintCycle(self.feature, self.selected_model, category=category).crew()
+
+        if emit:
+            crew.task_callback = lambda task_output: (emit(task_output.pydantic)
+                                                      if _is_artifact(task_output.pydantic) else None)
+
+        return crew.kickoff(
+            inputs={"input": issue["body"],
+                    "additional_context": additional_context,
+                    "output_base_path": self.output_base_path})
+
+    def _run_stage(self, index: int):
+        category = self.categories[index]
+
+        is_last_stage = index == len(self.categories) - 1
+
+        while True:
+            item = self._queues[index].get()
+
+            if item is _PIPELINE_STOP:
+                if not is_last_stage:
+                    self._queues[index + 1].put(_PIPELINE_STOP)
+                break
+
+            issue, context = item
+
+            artifacts = []
+
+            def emit(artifact: BaseModel):
+                # Stream each artifact into the next stage as soon as it is produced.
+                with self._lock:
+                    self._pending[issue["number"]] += 1
+
+                artifacts.append(artifact)
+
+                self._queues[index + 1].put((issue, artifact))
+
+            try:
+                output = self.run_category(category, issue, context,
+                                           emit=None if is_last_stage else emit)
+
+                logging.info(f"✅ Finished category={category} for issue #{issue['number']}")
+
+                if is_last_stage:
+                    self.results.setdefault(issue["number"], []).append(output)
+
+                elif not artifacts and output.pydantic:
+                    emit(output.pydantic)
+
+            except Exception as e:
+                logging.error(f"Error running category={category} for issue #{issue['number']}: {e}")
+
+                logging.error(traceback.format_exc())
+
+                with self._lock:
+                    self._failed.add(issue["number"])
+
+            self._finish_item(index, issue)
+
+    def _finish_item(self, index: int, issue: dict):
+        with self._lock:
+            if index == 0:
+                self._first_stage_items -= 1
+
+            self._pending[issue["number"]] -= 1
+
+            is_done = self._pending[issue["number"]] == 0
+
+            if is_done:
+                del self._pending[issue["number"]]
+
+            succeeded = issue["number"] not in self._failed
+
+        if is_done and self.on_issue_done:
+            try:
+                self.on_issue_done(issue, succeeded)
+
+            except Exception as e:
+                logging.error(f"Error completing issue #{issue['number']}: {e}")
+
+                logging.error(traceback.format_exc())
+
+    def close(self):
+        """Waits for all queued issues to finish, then stops the workers."""
+        if not self._workers:
+            return self.results
+
+        self._queues[0].put(_PIPELINE_STOP)
+
+        for worker in self._workers:
+            worker.join()
+
+        return self.results
+
+
+def _is_artifact(output: BaseModel) -> bool:
+    """Returns whether a task output is a finished document for the next stage."""
+    return (isinstance(output, AggregateDetails)
+            and output.doc_detail is not None
+            and bool(output.doc_detail.result_content))
@@ -0,0 +1,176 @@
+"""Registry of the LLM clients used by the crews.
+
+Each configured model prefix (ex. "REFERENCE", "CANDIDATE") is built into an
+LLM once per process and shared by every agent that selects it, so crews stop
+re-reading the environment and re-creating clients for every agent. All
+clients share one pooled HTTP session, and calls to each model are bounded by
+a per-model concurrency limit so that parallel crews don't overload a single
+serving endpoint. Deterministic calls go through the response cache
+(see llms.response_cache), and prompts are arranged for prefix caching
+(see llms.prefix_cache).
+
+The following environment variables are read for each model prefix:
+    <PREFIX>_LLM_PROVIDER: The LiteLLM provider, ex. "hosted_vllm".
+    <PREFIX>_LLM_ID: The model id.
+    <PREFIX>_LLM_TOKEN: The API token.
+    <PREFIX>_LLM_API_BASE: The API base url.
+    <PREFIX>_LLM_MAX_CONCURRENCY: (Optional) The maximum number of in-flight
+    calls to this model. Defaults to 4.
+"""
+
+from crewai import LLM
+import litellm
+import httpx
+import os
+import logging
+import threading
+from typing import List
+from llms import response_cache, prefix_cache
+
+logging.basicConfig(level=logging.INFO)
+
+_REQUIRED_SETTINGS = ["PROVIDER", "ID", "TOKEN", "API_BASE"]
+
+_DEFAULT_MAX_CONCURRENCY = 4
+
+_MAX_POOL_CONNECTIONS = 64
+
+_LLMS = {}
+
+_SEMAPHORES = {}
+
+_LOCK = threading.Lock()
+
+
+class RegisteredLLM(LLM):
+    """
+    An LLM whose calls are bounded by a shared per-model semaphore.
+    Deterministic (temperature=0) responses are served from the response
+    cache when it is enabled, and messages are ordered and tagged so that
+    backends can reuse the prefill of the shared prompt prefix.
+    """
+
+    def __init__(self, semaphore: threading.BoundedSemaphore, cache_params: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.semaphore = semaphore
+        self.cache_params = cache_params
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        messages = prefix_cache.order_messages(messages)
+
+        prefix_cache.set_current_task(getattr(kwargs.get("from_task"), "name", None))
+
+        # Calls that execute functions inside the LLM are never cached, so that
+        # their side effects still happen.
+        is_cacheable = self.temperature == 0 and not available_functions
+
+        cache = response_cache.get_response_cache() if is_cacheable else None
+
+        if cache:
+            response = cache.get(self.model, messages, tools, self.cache_params)
+
+            if response is not None:
+                return response
+
+        with self.semaphore:
+            response = super().call(messages, tools=tools, callbacks=callbacks,
+                                    available_functions=available_functions, **kwargs)
+
+        if cache and isinstance(response, str) and response:
+            cache.put(self.model, messages, tools, self.cache_params, response)
+
+        return response
+
+    def _prepare_completion_params(self, messages, tools=None):
+        params = super()._prepare_completion_params(messages, tools)
+
+        params["metadata"] = {**(params.get("metadata") or {}),
+                              "crew_task": prefix_cache.get_current_task()}
+
+        params["extra_body"] = {**(params.get("extra_body") or {}),
+                                "prompt_cache_key": prefix_cache.get_prefix_cache_key(messages)}
+
+        return params
+
+
+def validate_model_config(model_prefixes: List[str]):
+    """
+    Validates that the environment variables required by the given model
+    prefixes are set.
+    :param model_prefixes: The model prefixes to validate.
+    :raises ValueError: If any required environment variable is missing.
+    """
+    missing = [f"{model_prefix}_LLM_{setting}"
+               for model_prefix in model_prefixes
+               for setting in _REQUIRED_SETTINGS
+               if not os.getenv(f"{model_prefix}_LLM_{setting}")]
+
+    if missing:
+        raise ValueError(f"Missing LLM configuration: {', '.join(missing)}")
+
+    for model_prefix in model_prefixes:
+        get_max_concurrency(model_prefix)
+
+
+def get_max_concurrency(model_prefix: str) -> int:
+    """Returns the maximum number of in-flight calls allowed for a model."""
+    value = os.getenv(f"{model_prefix}_LLM_MAX_CONCURRENCY",
+                      str(_DEFAULT_MAX_CONCURRENCY))
+
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError(f"Invalid {model_prefix}_LLM_MAX_CONCURRENCY: '{value}'")
+
+    return int(value)
+
+
+def get_model_semaphore(model_prefix: str) -> threading.BoundedSemaphore:
+    """
+    Returns the semaphore that bounds concurrent calls to a model. Other
+    clients of the same model (ex. evaluation judges) can share it.
+    """
+    with _LOCK:
+        if model_prefix not in _SEMAPHORES:
+            _SEMAPHORES[model_prefix] = threading.BoundedSemaphore(
+                get_max_concurrency(model_prefix))
+
+        return _SEMAPHORES[model_prefix]
+
+
+def get_llm(model_prefix: str, **params) -> LLM:
+    """
+    Returns the shared LLM for the given model prefix and parameters,
+    building it on first use.
+    :param model_prefix: The model prefix, ex. "REFERENCE".
+    :param params: Additional LLM parameters, ex. max_tokens, temperature.
+    :return: The LLM instance.
+    """
+    key = (model_prefix, repr(sorted(params.items())))
+
+    if key in _LLMS:
+        return _LLMS[key]
+
+    validate_model_config([model_prefix])
+
+    semaphore = get_model_semaphore(model_prefix)
+
+    with _LOCK:
+        if key not in _LLMS:
+            if litellm.client_session is None:
+                litellm.client_session = httpx.Client(
+                    limits=httpx.Limits(max_connections=_MAX_POOL_CONNECTIONS,
+                                        max_keepalive_connections=_MAX_POOL_CONNECTIONS))
+
+            logging.info(f"Building LLM for model prefix '{model_prefix}'...")
+
+            _LLMS[key] = RegisteredLLM(
+                semaphore=semaphore,
+                cache_params=params,
+                model=os.getenv(f'{model_prefix}_LLM_PROVIDER') + "/" +
+                      os.getenv(f'{model_prefix}_LLM_ID'),
+                api_key=os.getenv(f'{model_prefix}_LLM_TOKEN'),
+                base_url=os.getenv(f'{model_prefix}_LLM_API_BASE'),
+                **params)
+
+            prefix_cache.register_prefix_cache_stats()
+
+        return _LLMS[key]
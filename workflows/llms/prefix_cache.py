@@ -0,0 +1,141 @@
+"""Prompt-prefix reuse for multi-task crews.
+
+The tasks of a crew share the same agent system prompts, and each task
+receives the outputs of the previous tasks as context, which grows by
+appending. CrewAI puts that context in the user message after the task
+description, so no two tasks share more than the system prompt. The context
+is moved to the end of the leading system block instead, which lets vLLM
+(--enable-prefix-caching) and OpenAI-compatible backends reuse the prefill of
+the system prompt and of the shared context between tasks. Each request also
+carries a "prompt_cache_key" derived from the agent system prompt, which
+OpenAI-compatible backends use to route requests that share a prefix to the
+same cache.
+
+The number of prompt tokens served from the prefix cache is tracked per task.
+(vLLM only reports cached tokens when started with
+--enable-prompt-tokens-details.)
+"""
+
+import json
+import hashlib
+import logging
+import threading
+import litellm
+from collections import defaultdict
+from crewai.utilities import I18N
+from litellm.integrations.custom_logger import CustomLogger
+
+logging.basicConfig(level=logging.INFO)
+
+_CURRENT_TASK = threading.local()
+
+_LOCK = threading.Lock()
+
+# The separator CrewAI puts between the task description and its context, and
+# the instructions it appends after the task input.
+_CONTEXT_SEPARATOR = I18N().slice("task_with_context").split("{task}")[1].split("{context}")[0]
+
+_TASK_SUFFIX = I18N().slice("task").split("{input}")[1]
+
+
+def order_messages(messages: list) -> list:
+    """
+    Moves the task context out of the first user message to the end of the
+    leading system message, so that the system prompt and the context shared
+    with the previous tasks form the prefix, followed by the task-specific
+    description and instructions.
+    """
+    if isinstance(messages, str) or len(messages) < 2:
+        return messages
+
+    system, user = messages[0], messages[1]
+
+    if system.get("role") != "system" or user.get("role") != "user":
+        return messages
+
+    content = user.get("content")
+
+    if not isinstance(content, str) or _CONTEXT_SEPARATOR not in content:
+        return messages
+
+    task, context = content.split(_CONTEXT_SEPARATOR, 1)
+
+    suffix = ""
+
+    if context.endswith(_TASK_SUFFIX):
+        context, suffix = context[:-len(_TASK_SUFFIX)], _TASK_SUFFIX
+
+    return ([{**system, "content": f"{system.get('content')}{_CONTEXT_SEPARATOR}{context}"},
+             {**user, "content": f"{task}{suffix}"}] + list(messages[2:]))
+
+
+def get_prefix_cache_key(messages: list) -> str:
+    """Returns a key identifying the agent system prompt of the messages."""
+    if isinstance(messages, str):
+        return ""
+
+    prefix = [str(message.get("content")).split(_CONTEXT_SEPARATOR, 1)[0] for message in messages
+              if message.get("role") == "system"]
+
+    return hashlib.sha256(json.dumps(prefix, default=str).encode()).hexdigest()[:32]
+
+
+def set_current_task(task_name: str):
+    """Records the task whose LLM calls are issued from the current thread."""
+    _CURRENT_TASK.name = task_name
+
+
+def get_current_task() -> str:
+    """Returns the task whose LLM calls are issued from the current thread."""
+    return getattr(_CURRENT_TASK, "name", "") or "unknown"
+
+
+class PrefixCacheStats(CustomLogger):
+    """Collects the prompt and cached-prompt token counts of each task."""
+
+    def __init__(self):
+        super().__init__()
+        self.stats = defaultdict(lambda: {"prompt_tokens": 0, "cached_tokens": 0})
+        self._lock = threading.Lock()
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        usage = getattr(response_obj, "usage", None)
+
+        if not usage:
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+
+        metadata = (kwargs.get("litellm_params") or {}).get("metadata") or {}
+
+        task_name = metadata.get("crew_task", "unknown")
+
+        with self._lock:
+            self.stats[task_name]["prompt_tokens"] += usage.prompt_tokens or 0
+
+            self.stats[task_name]["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+    async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self.log_success_event(kwargs, response_obj, start_time, end_time)
+
+    def get_stats(self) -> dict:
+        """Returns the token counts and the cached-token ratio of each task."""
+        with self._lock:
+            return {task_name: {**counts,
+                                "cached_ratio": (counts["cached_tokens"] / counts["prompt_tokens"]
+                                                 if counts["prompt_tokens"] else 0.0)}
+                    for task_name, counts in self.stats.items()}
+
+
+prefix_cache_stats = PrefixCacheStats()
+
+
+def register_prefix_cache_stats():
+    """
+    Registers prefix_cache_stats as a LiteLLM success callback, once per
+    process. CrewAI replaces litellm.callbacks with the callbacks of each
+    call, but keeps the success callbacks of other types.
+    """
+    with _LOCK:
+        if prefix_cache_stats not in litellm.success_callback:
+            litellm.success_callback.append(prefix_cache_stats)
@@ -0,0 +1,294 @@
+"""Persistent response cache for deterministic LLM calls.
+
+Responses are stored in a local SQLite database keyed by a hash of the model,
+the normalized messages, the tools and the call parameters, so that retries,
+re-runs and reflect loops don't send identical prompts to the model twice.
+Entries expire after a TTL and the least recently used entries are evicted
+once the cache is full.
+
+Near-duplicate prompts can optionally be matched by embedding similarity,
+using the embedding model configured with the EMBED_LLM_* variables. The
+prompt embeddings of each scope are kept in memory as a normalized matrix,
+so a lookup is a single matrix-vector product.
+
+The following environment variables configure the cache:
+    LLM_CACHE_ENABLED: Whether the cache is enabled. Defaults to "true".
+    LLM_CACHE_PATH: The SQLite database path. Defaults to ".llm_cache/responses.db".
+    LLM_CACHE_TTL_SECONDS: The time-to-live of an entry. Defaults to 7 days.
+    LLM_CACHE_MAX_ENTRIES: The maximum number of entries. Defaults to 10000.
+    LLM_CACHE_SIMILARITY_THRESHOLD: (Optional) The minimum cosine similarity
+    for a near-duplicate prompt to be served from the cache. Similarity
+    lookups are disabled if unset.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import traceback
+import numpy as np
+from openai import OpenAI
+from collections import OrderedDict
+from typing import Any, Optional
+
+logging.basicConfig(level=logging.INFO)
+
+_CACHE = None
+
+_LOCK = threading.Lock()
+
+# Expired entries are deleted at most once per interval.
+_EXPIRE_INTERVAL_SECONDS = 60
+
+# Query embeddings computed by get() are kept for the following put().
+_MAX_QUERY_EMBEDDINGS = 256
+
+
+def normalize_messages(messages: Any) -> list:
+    """Normalizes chat messages so that whitespace-only differences share a key."""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+
+    return [{"role": message.get("role", ""),
+             "content": re.sub(r"\s+", " ", str(message.get("content", ""))).strip()}
+            for message in messages]
+
+
+class ResponseCache:
+    """A SQLite-backed LLM response cache with TTL and LRU eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int,
+                 similarity_threshold: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._embedding_client = None
+        self._expired_at = 0.0
+        self._vectors = {}
+        self._query_embeddings = OrderedDict()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         "key TEXT PRIMARY KEY, scope TEXT, response TEXT, "
+                         "embedding BLOB, created_at REAL, accessed_at REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+        self._db.commit()
+
+    def make_keys(self, model: str, messages: Any, tools: Any, params: dict):
+        """
+        Returns the (key, scope) of a call. The key identifies the exact call;
+        the scope identifies every call that differs from it only by prompt.
+        """
+        scope = hashlib.sha256(json.dumps([model, tools, params], sort_keys=True,
+                                          default=str).encode()).hexdigest()
+
+        key = hashlib.sha256((scope + json.dumps(normalize_messages(messages),
+                                                 sort_keys=True)).encode()).hexdigest()
+
+        return key, scope
+
+    def get(self, model: str, messages: Any, tools: Any, params: dict) -> Optional[str]:
+        """Returns the cached response of a call, or None on a cache miss."""
+        key, scope = self.make_keys(model, messages, tools, params)
+
+        with self._lock:
+            self._expire()
+
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+
+            if row:
+                self._touch(key)
+                self.stats["hits"] += 1
+                return row[0]
+
+        if self.similarity_threshold is not None:
+            response = self._get_similar(key, scope, messages)
+
+            if response is not None:
+                with self._lock:
+                    self.stats["similar_hits"] += 1
+                return response
+
+        with self._lock:
+            self.stats["misses"] += 1
+
+        return None
+
+    def put(self, model: str, messages: Any, tools: Any, params: dict, response: str):
+        """Stores the response of a call."""
+        key, scope = self.make_keys(model, messages, tools, params)
+
+        embedding = None
+
+        if self.similarity_threshold is not None:
+            with self._lock:
+                embedding = self._query_embeddings.pop(key, None)
+
+            if embedding is None:
+                try:
+                    embedding = _normalize(self._embed(messages))
+
+                except Exception as e:
+                    # The response is still cached, but not matched by similarity.
+                    logging.error(f"Error embedding LLM prompt for the response cache: {e}")
+
+                    logging.error(traceback.format_exc())
+
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, scope, response,
+                              embedding.tobytes() if embedding is not None else None, now, now))
+            self._evict()
+            self._db.commit()
+
+            if embedding is not None and scope in self._vectors:
+                keys, matrix = self._vectors[scope]
+
+                if key not in keys:
+                    self._vectors[scope] = (keys + [key],
+                                            np.vstack([matrix, embedding]) if keys else embedding[None, :])
+
+    def get_stats(self) -> dict:
+        """Returns the hit/miss counts and the hit rate of the cache."""
+        with self._lock:
+            stats = dict(self.stats)
+
+        total = sum(stats.values())
+
+        hits = stats["hits"] + stats["similar_hits"]
+
+        return {**stats, "hit_rate": hits / total if total else 0.0}
+
+    def _get_similar(self, key: str, scope: str, messages: Any) -> Optional[str]:
+        try:
+            query = _normalize(self._embed(messages))
+
+            with self._lock:
+                self._query_embeddings[key] = query
+
+                while len(self._query_embeddings) > _MAX_QUERY_EMBEDDINGS:
+                    self._query_embeddings.popitem(last=False)
+
+                keys, matrix = self._get_vectors(scope)
+
+                if not keys:
+                    return None
+
+                similarities = matrix @ query
+
+                best = int(np.argmax(similarities))
+
+                if similarities[best] < self.similarity_threshold:
+                    return None
+
+                row = self._db.execute("SELECT response FROM responses WHERE key = ?",
+                                       (keys[best],)).fetchone()
+
+                if not row:
+                    return None
+
+                self._touch(keys[best])
+
+                return row[0]
+
+        except Exception as e:
+            logging.error(f"Error looking up similar LLM responses: {e}")
+
+            logging.error(traceback.format_exc())
+
+    def _get_vectors(self, scope: str):
+        """Returns the keys and normalized embedding matrix of a scope, loading them on first use."""
+        if scope not in self._vectors:
+            rows = self._db.execute("SELECT key, embedding FROM responses "
+                                    "WHERE scope = ? AND embedding IS NOT NULL",
+                                    (scope,)).fetchall()
+
+            keys = [row[0] for row in rows]
+
+            matrix = (np.vstack([_load_embedding(row[1]) for row in rows]) if rows
+                      else np.empty((0, 0), dtype=np.float32))
+
+            self._vectors[scope] = (keys, matrix)
+
+        return self._vectors[scope]
+
+    def _embed(self, messages: Any) -> list:
+        if self._embedding_client is None:
+            self._embedding_client = OpenAI(api_key=os.getenv("EMBED_LLM_TOKEN"),
+                                            base_url=os.getenv("EMBED_LLM_API_BASE"))
+
+        text = "\n".join(message["content"] for message in normalize_messages(messages))
+
+        response = self._embedding_client.embeddings.create(model=os.getenv("EMBED_LLM_ID"),
+                                                            input=text)
+
+        return response.data[0].embedding
+
+    def _touch(self, key: str):
+        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                         (time.time(), key))
+        self._db.commit()
+
+    def _expire(self):
+        now = time.time()
+
+        if now - self._expired_at < _EXPIRE_INTERVAL_SECONDS:
+            return
+
+        self._expired_at = now
+
+        cursor = self._db.execute("DELETE FROM responses WHERE created_at < ?",
+                                  (now - self.ttl_seconds,))
+
+        if cursor.rowcount:
+            self._vectors.clear()
+
+    def _evict(self):
+        cursor = self._db.execute("DELETE FROM responses WHERE key IN ("
+                                  "SELECT key FROM responses ORDER BY accessed_at DESC "
+                                  "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+        if cursor.rowcount:
+            self._vectors.clear()
+
+
+def _normalize(embedding: list) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def _load_embedding(value: bytes) -> np.ndarray:
+    return np.frombuffer(value, dtype=np.float32)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Returns the process-wide response cache, or None if it is disabled."""
+    global _CACHE
+
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    with _LOCK:
+        if _CACHE is None:
+            threshold = os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD")
+
+            _CACHE = ResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", ".llm_cache/responses.db"),
+                ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60)),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10_000)),
+                similarity_threshold=float(threshold) if threshold else None)
+
+        return _CACHE
@@ -0,0 +1,134 @@
+"""Tasks that can run in-process without an LLM call.
+
+A task config can declare a "deterministic" step, in which case the task's
+output is computed directly and fed to the next task, instead of being
+produced by the agent's model. Example:
+
+    pre_build:
+      description: >
+        Pass the input to the next task.
+      expected_output: >
+        The input of the task.
+      agent: reviewer
+      context:
+        - plan
+      deterministic:
+        type: pass_through
+
+Only the agent's LLM call is replaced: the step output goes through the
+regular task execution, so output_pydantic, output_file, callbacks and task
+events still apply.
+
+The following step types are supported:
+    pass_through: Outputs the output of the last task listed in the task's
+    "context" (set it to the previous task; otherwise CrewAI passes the
+    combined output of all the previous tasks).
+    copy: Copies the file at "source" to "destination" and outputs the
+    destination path.
+    json_path: Outputs the values matched by "json_path" in "json_string"
+    (defaults to the task's context).
+
+String values in the step may use the crew inputs, ex. "{output_base_path}".
+"""
+
+from crewai import Task
+from crewai.tasks.task_output import TaskOutput
+from pydantic import Field, PrivateAttr
+from typing import Any, Optional
+from tools import file_tools
+import os
+import shutil
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+
+class DeterministicTask(Task):
+    """
+    A Task that runs in-process when its config declares a deterministic
+    step, and behaves as a regular Task otherwise.
+    """
+
+    deterministic: Optional[dict] = Field(
+        default=None,
+        description="Deterministic step which replaces the agent's LLM call")
+
+    _original_deterministic: Optional[dict] = PrivateAttr(default=None)
+
+    def interpolate_inputs_and_add_conversation_history(self, inputs: dict[str, Any]) -> None:
+        super().interpolate_inputs_and_add_conversation_history(inputs)
+
+        if not self.deterministic:
+            return
+
+        if self._original_deterministic is None:
+            self._original_deterministic = dict(self.deterministic)
+
+        self.deterministic = {key: self._interpolate(value, inputs)
+                              for key, value in self._original_deterministic.items()}
+
+    def _execute_core(self, agent, context: Optional[str], tools) -> TaskOutput:
+        if not self.deterministic:
+            return super()._execute_core(agent, context, tools)
+
+        logging.info(f"Running deterministic task '{self.name}' "
+                     f"({self.deterministic.get('type')}) without an LLM call...")
+
+        agent = agent or self.agent
+
+        try:
+            return super()._execute_core(_StepAgent(agent) if agent else None, context, tools)
+
+        finally:
+            self.agent = agent
+
+    def run_step(self, context: str) -> str:
+        """Computes the output of the deterministic step."""
+        step_type = self.deterministic.get("type")
+
+        if step_type == "pass_through":
+            if isinstance(self.context, list) and self.context and self.context[-1].output:
+                return self.context[-1].output.raw
+
+            return context
+
+        if step_type == "copy":
+            source, destination = self.deterministic["source"], self.deterministic["destination"]
+
+            os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+
+            shutil.copyfile(source, destination)
+
+            return destination
+
+        if step_type == "json_path":
+            return file_tools.extract_json_path(self.deterministic.get("json_string", context),
+                                                self.deterministic["json_path"])
+
+        raise ValueError(f"Unsupported deterministic task type: '{step_type}'")
+
+    @staticmethod
+    def _interpolate(value: Any, inputs: dict[str, Any]) -> Any:
+        if not isinstance(value, str):
+            return value
+
+        for key, input_value in inputs.items():
+            value = value.replace("{" + key + "}", str(input_value))
+
+        return value
+
+
+class _StepAgent:
+    """
+    Stands in for the agent of a deterministic task: the task's step is run
+    instead of the agent's LLM call, everything else is the agent's.
+    """
+
+    def __init__(self, agent):
+        self._agent = agent
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._agent, name)
+
+    def execute_task(self, task: DeterministicTask, context: Optional[str] = None, tools=None) -> str:
+        return task.run_step(context or "")
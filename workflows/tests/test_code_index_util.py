@@ -0,0 +1,22 @@
+import re
+import pytest
+from tools import code_index_util
+
+
+@pytest.mark.parametrize("pattern, text, literals", [
+    (r"\x41BCDfoo", "ABCDfoo", ["BCDfoo"]),
+    (r"\u0041BCDfoo", "ABCDfoo", ["BCDfoo"]),
+    (r"\U00000041BCDfoo", "ABCDfoo", ["BCDfoo"]),
+    (r"\N{LATIN CAPITAL LETTER A}BCDfoo", "ABCDfoo", ["BCDfoo"]),
+    (r"\101BCDfoo", "ABCDfoo", ["BCDfoo"]),
+    (r"\0123foo", "\n3foo", ["3foo"]),
+    (r"(abc)\1xyz", "abcabcxyz", ["xyz"]),
+    (r"abc\.def\d+ghi", "abc.def12ghi", ["abc.def", "ghi"]),
+])
+def test_required_literals_skip_escape_payloads(pattern, text, literals):
+    """Escapes end the literal run without leaking their payload into it."""
+    assert code_index_util._get_required_literals(pattern) == literals
+
+    match = re.search(pattern, text)
+
+    assert match and all(literal in match.group(0) for literal in literals)
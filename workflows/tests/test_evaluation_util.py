@@ -0,0 +1,24 @@
+import json
+from tools import evaluation_util, results_util, unittest_util
+
+
+def test_reference_based_results_pass_gate(tmp_path):
+    """Reference-based test data gets no judge result columns, so passing scores pass the gate."""
+    test_data_path = tmp_path / "test_data.jsonl"
+
+    with open(test_data_path, "w") as file:
+        for prediction, references in [("The cat sat on the mat.", ["The cat is on the mat."]),
+                                       ("A quick brown fox.", ["The quick brown fox."])]:
+            file.write(json.dumps({"predictions": prediction, "references": references}) + "\n")
+
+    writer = results_util.ResultWriter("reference_based", results_dir=str(tmp_path / "results"))
+
+    for data in evaluation_util.iter_test_record_batches(str(test_data_path)):
+        assert not [column for column in data.columns if column.startswith("eval_")]
+
+        for column in ["bleu4_score", "rougel_score", "meteor_score", "bert_score"]:
+            data[column] = 1.0
+
+        writer.write(data)
+
+    assert unittest_util.find_failing_rows(writer.path, 0.7) == []
@@ -0,0 +1,206 @@
+###############################################################################
+#  Provides a harness which benchmarks several candidate models at once:
+#  one benchmark file is fanned out across N model prefixes concurrently,
+#  each model generating candidates for the benchmark baselines under its own
+#  concurrency limit. Latency percentiles, throughput and judge scores are
+#  recorded per model and written to a comparison table.
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import time
+import asyncio
+import logging
+import traceback
+import numpy as np
+import pandas as pd
+from openai import AsyncOpenAI
+from typing import List
+from llms import llm_registry
+from tools import evaluation_util, results_util
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+##############################################
+# Generation
+##############################################
+def get_generation_client(model_prefix: str) -> AsyncOpenAI:
+    """Returns an async client of the given candidate model."""
+    return AsyncOpenAI(api_key=os.getenv(f"{model_prefix}_LLM_TOKEN"),
+                       base_url=os.getenv(f"{model_prefix}_LLM_API_BASE"))
+
+
+async def generate_candidates(model_prefix: str, client: AsyncOpenAI, semaphore: asyncio.Semaphore,
+                              prompts: List[str]) -> pd.DataFrame:
+    """
+    Generates a candidate for each prompt with the given model, keeping at
+    most <PREFIX>_LLM_MAX_CONCURRENCY requests in flight.
+    :param model_prefix: The model prefix, ex. "CANDIDATE".
+    :param client: The async client of the model.
+    :param semaphore: The semaphore bounding the in-flight requests of the model.
+    :param prompts: The prompts (benchmark baselines).
+    :return: The candidate, latency, completion tokens and error of each prompt.
+    """
+    model_id = os.getenv(f"{model_prefix}_LLM_ID")
+
+    async def generate(prompt: str) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+
+            try:
+                response = await client.chat.completions.create(
+                    model=model_id,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0)
+
+                return {"candidate": response.choices[0].message.content or "",
+                        "latency": time.perf_counter() - start,
+                        "completion_tokens": response.usage.completion_tokens if response.usage else 0,
+                        "error": ""}
+
+            except Exception as e:
+                logging.error(f"Error generating candidate with {model_prefix}: {e}")
+
+                return {"candidate": "", "latency": time.perf_counter() - start,
+                        "completion_tokens": 0, "error": str(e)}
+
+    return pd.DataFrame(await asyncio.gather(*[generate(prompt) for prompt in prompts]))
+
+
+async def generate_all_candidates(clients: dict, semaphores: dict, prompts: List[str]) -> dict:
+    """
+    Generates candidates with all models concurrently.
+    :param clients: The async client of each model prefix.
+    :param semaphores: The semaphore of each model prefix.
+    :param prompts: The prompts (benchmark baselines).
+    :return: The generated candidates and the wall-clock time of each model.
+    """
+    async def run(model_prefix: str):
+        start = time.perf_counter()
+
+        candidates = await generate_candidates(model_prefix, clients[model_prefix],
+                                               semaphores[model_prefix], prompts)
+
+        return model_prefix, candidates, time.perf_counter() - start
+
+    return {model_prefix: (candidates, elapsed)
+            for model_prefix, candidates, elapsed in
+            await asyncio.gather(*[run(model_prefix) for model_prefix in clients])}
+
+
+##############################################
+# Benchmark Harness
+##############################################
+def summarize_model(model_prefix: str, results: pd.DataFrame, elapsed: float,
+                    threshold: float) -> dict:
+    """
+    Returns the comparison table row of a model. Failed generations are
+    counted as errors and left out of the relevancy scores.
+    """
+    latencies = results["latency"].to_numpy()
+
+    scores = results.loc[results["error"] == "", "eval_scores_relevancy"]
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) if len(latencies) else (0, 0, 0)
+
+    return {"model_prefix": model_prefix,
+            "model_id": os.getenv(f"{model_prefix}_LLM_ID"),
+            "rows": len(results),
+            "errors": int((results["error"] != "").sum()),
+            "latency_p50_s": p50,
+            "latency_p90_s": p90,
+            "latency_p99_s": p99,
+            "tokens_per_second": results["completion_tokens"].sum() / elapsed if elapsed else 0.0,
+            "mean_relevancy": scores.mean() if len(scores) else float("nan"),
+            "pass_rate": (scores >= threshold).mean() if len(scores) else float("nan")}
+
+
+def run_multi_model_benchmark(benchmark_file_path: str,
+                              model_prefixes: List[str],
+                              judge_model_prefix: str = "REFERENCE",
+                              threshold: float = 0.7,
+                              run_id: str = None) -> str:
+    """
+    Benchmarks several candidate models against one benchmark file. Each
+    model generates a candidate for every baseline, and the candidates are
+    scored with the AnswerRelevancy judge. Failed generations are not
+    judged and are reported as errors.
+    :param benchmark_file_path: Path to the benchmark data file.
+    :param model_prefixes: The prefixes of the models to benchmark.
+    :param judge_model_prefix: The prefix of the judge model.
+    :param threshold: The threshold to use for computing scores.
+    :param run_id: The evaluation run id. Defaults to a new run id.
+    :return: The comparison table, and the paths of the Parquet results and
+    the comparison CSV.
+    """
+    try:
+        writer = results_util.ResultWriter("multi_model_benchmark", run_id=run_id)
+
+        model_results = {model_prefix: [] for model_prefix in model_prefixes}
+
+        model_elapsed = {model_prefix: 0.0 for model_prefix in model_prefixes}
+
+        clients = {model_prefix: get_generation_client(model_prefix) for model_prefix in model_prefixes}
+
+        semaphores = {model_prefix: asyncio.Semaphore(llm_registry.get_max_concurrency(model_prefix))
+                      for model_prefix in model_prefixes}
+
+        # One event loop for the whole benchmark, so that the clients keep
+        # their connections between batches.
+        with asyncio.Runner() as runner:
+            for data in evaluation_util.iter_test_record_batches(benchmark_file_path):
+                prompts = [str(baseline) for baseline in data["baseline"]]
+
+                generated = runner.run(generate_all_candidates(clients, semaphores, prompts))
+
+                for model_prefix, (candidates, elapsed) in generated.items():
+                    candidates.index = data.index
+
+                    succeeded = candidates["error"] == ""
+
+                    verdicts = evaluation_util.judge_answer_relevancy(
+                        [prompt for prompt, ok in zip(prompts, succeeded) if ok],
+                        candidates.loc[succeeded, "candidate"].tolist(),
+                        judge_model_prefix,
+                        threshold)
+
+                    candidates["eval_scores_relevancy"] = np.nan
+
+                    candidates["eval_reasons_relevancy"] = ""
+
+                    candidates.loc[succeeded, "eval_scores_relevancy"] = [float(score) for score, _ in verdicts]
+
+                    candidates.loc[succeeded, "eval_reasons_relevancy"] = [str(reason) for _, reason in verdicts]
+
+                    results = pd.concat([data[["baseline"]], candidates], axis=1).assign(model_prefix=model_prefix)
+
+                    writer.write(results)
+
+                    model_results[model_prefix].append(results[["latency", "completion_tokens",
+                                                                "error", "eval_scores_relevancy"]])
+
+                    model_elapsed[model_prefix] += elapsed
+
+        comparison = pd.DataFrame([summarize_model(model_prefix,
+                                                   pd.concat(model_results[model_prefix]),
+                                                   model_elapsed[model_prefix],
+                                                   threshold)
+                                   for model_prefix in model_prefixes
+                                   if model_results[model_prefix]])
+
+        comparison_path = os.path.join(os.path.dirname(writer.path), "comparison.csv")
+
+        comparison.to_csv(comparison_path, index=False)
+
+        return (f"{comparison.to_string(index=False, float_format='{:.3f}'.format)}\n\n"
+                f"{writer.summary()}\nComparison table saved to {comparison_path}")
+
+    except Exception as e:
+        logging.error(f"Error processing multi-model benchmark from {benchmark_file_path}: {e}")
+
+        logging.error(traceback.format_exc())
@@ -0,0 +1,261 @@
+###############################################################################
+#  Provides a batched BERTScore implementation for CPU-only evaluation nodes.
+#  Texts are deduplicated, bucketed by token length to cut padding waste and
+#  embedded in configurable batches; reference embeddings are cached on disk
+#  across runs, since references repeat heavily between evaluations, and in
+#  a bounded in-memory LRU. Tokenization and token weighting follow the
+#  bert_score package, so scores match bert_score.score (see verify_parity).
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import hashlib
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+##############################################
+# Configuration
+##############################################
+# Smaller or distilled models (ex. "distilbert-base-uncased",
+# "microsoft/deberta-base-mnli") are much faster on CPU than the default.
+_MODEL_TYPE = os.getenv("BERTSCORE_MODEL", "roberta-large")
+
+_NUM_LAYERS = os.getenv("BERTSCORE_NUM_LAYERS")
+
+_BATCH_SIZE = int(os.getenv("BERTSCORE_BATCH_SIZE", 32))
+
+_CACHE_DIR = os.getenv("BERTSCORE_CACHE_DIR", ".bertscore_cache")
+
+_MAX_CACHED_EMBEDDINGS = int(os.getenv("BERTSCORE_MAX_CACHED_EMBEDDINGS") or 10000)
+
+_PARITY_TOLERANCE = 1e-4
+
+_PARITY_SAMPLE = (["The cat sat on the mat.", "A quick brown fox jumps over the dog.", ""],
+                  [["The cat is sitting on the mat.", "There is a cat on the mat."],
+                   ["The quick brown fox jumped over the lazy dog."],
+                   ["An empty prediction."]])
+
+_SCORER = None
+
+_SCORER_LOCK = threading.Lock()
+
+
+##############################################
+# Scorer
+##############################################
+class CachedBERTScorer:
+    """
+    Computes BERTScore F1 (greedy token matching over contextual embeddings,
+    as in the bert_score package) with an embedding cache. Reference
+    embeddings are kept in a bounded LRU and on disk; prediction embeddings
+    are dropped once they are scored.
+    """
+    def __init__(self, model_type: str, num_layers: int = None,
+                 batch_size: int = 32, cache_dir: str = None,
+                 max_cached_embeddings: int = _MAX_CACHED_EMBEDDINGS):
+        import torch
+        from bert_score.utils import get_model, get_tokenizer, model2layers
+
+        self.torch = torch
+        self.model_type = model_type
+        self.num_layers = num_layers or model2layers[model_type]
+        self.batch_size = batch_size
+        # The slow tokenizer, as in bert_score: sent_encode only adds the
+        # prefix space of RoBERTa and GPT-2 for the slow tokenizer classes.
+        self.tokenizer = get_tokenizer(model_type, use_fast=False)
+        self.model = get_model(model_type, self.num_layers)
+        self.model.eval()
+        self.max_cached_embeddings = max_cached_embeddings
+        self.embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_dir = (os.path.join(cache_dir, f"{model_type.replace('/', '--')}-{self.num_layers}")
+                          if cache_dir else None)
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def score(self, predictions: List[str], references: List[List[str]]) -> List[float]:
+        """
+        Computes the BERTScore F1 of each prediction against its references
+        (the best-matching reference is used; 0 without references).
+        """
+        # The scorer is shared by the threads of the process (ex. concurrent
+        # benchmark shards); the model and the LRU are used by one at a time.
+        with self._lock:
+            reference_embeddings = self.embed([ref for refs in references for ref in refs], persist=True)
+
+            prediction_embeddings = self.embed(predictions, persist=False)
+
+        return [max((self._f1(prediction_embeddings[self._key(prediction)],
+                              reference_embeddings[self._key(ref)])
+                     for ref in refs), default=0.0)
+                for prediction, refs in zip(predictions, references)]
+
+    def embed(self, texts: List[str], persist: bool) -> dict:
+        """
+        Returns the (embedding, weights) of each text, keyed by text hash.
+        Texts which are not cached are embedded; if persist is True, their
+        embeddings are cached in memory and on disk.
+        """
+        results, pending = {}, {}
+
+        for text in texts:
+            key = self._key(text)
+
+            if key in results or key in pending:
+                continue
+
+            if key in self.embeddings:
+                self.embeddings.move_to_end(key)
+
+                results[key] = self.embeddings[key]
+
+                continue
+
+            path = self._path(key)
+
+            if path and os.path.exists(path):
+                with np.load(path) as cached:
+                    results[key] = (cached["embedding"], cached["weights"])
+
+                self._cache(key, results[key])
+            else:
+                pending[key] = text
+
+        # Bucket by length so that each batch holds texts of similar size.
+        pending = sorted(pending.items(), key=lambda item: len(item[1]))
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+
+            for (key, _), embedding in zip(batch, self._encode([text for _, text in batch])):
+                results[key] = embedding
+
+                if persist:
+                    self._cache(key, embedding)
+
+                    if self.cache_dir:
+                        np.savez(self._path(key), embedding=embedding[0], weights=embedding[1])
+
+        return results
+
+    def _cache(self, key: str, embedding: tuple):
+        self.embeddings[key] = embedding
+
+        while len(self.embeddings) > self.max_cached_embeddings:
+            self.embeddings.popitem(last=False)
+
+    def _encode(self, texts: List[str]) -> List[tuple]:
+        from bert_score.utils import sent_encode, padding
+
+        ids = [sent_encode(self.tokenizer, text) for text in texts]
+
+        padded, lengths, mask = padding(ids, self.tokenizer.pad_token_id, dtype=self.torch.long)
+
+        with self.torch.no_grad():
+            hidden = self.model(padded, attention_mask=mask)[0]
+
+        hidden = hidden / hidden.norm(dim=-1, keepdim=True)
+
+        # As in bert_score (without idf): the special tokens are matched
+        # against, but weigh nothing in the precision and recall means.
+        special = {self.tokenizer.sep_token_id, self.tokenizer.cls_token_id}
+
+        return [(hidden[i, :lengths[i]].numpy(),
+                 np.array([0.0 if token in special else 1.0 for token in ids[i]], dtype=np.float32))
+                for i in range(len(texts))]
+
+    def _f1(self, candidate: tuple, reference: tuple) -> float:
+        (candidate, candidate_weights), (reference, reference_weights) = candidate, reference
+
+        if not candidate_weights.sum() or not reference_weights.sum():
+            return 0.0
+
+        similarity = candidate @ reference.T
+
+        precision = (similarity.max(axis=1) * candidate_weights).sum() / candidate_weights.sum()
+
+        recall = (similarity.max(axis=0) * reference_weights).sum() / reference_weights.sum()
+
+        return float(2 * precision * recall / (precision + recall)) if precision + recall else 0.0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str):
+        return os.path.join(self.cache_dir, f"{key}.npz") if self.cache_dir else None
+
+
+def get_scorer() -> CachedBERTScorer:
+    """Returns the process-wide BERTScore scorer, loading the model on first use."""
+    global _SCORER
+
+    with _SCORER_LOCK:
+        if _SCORER is None:
+            logging.info(f"Loading BERTScore model '{_MODEL_TYPE}'...")
+
+            _SCORER = CachedBERTScorer(_MODEL_TYPE,
+                                       num_layers=int(_NUM_LAYERS) if _NUM_LAYERS else None,
+                                       batch_size=_BATCH_SIZE,
+                                       cache_dir=_CACHE_DIR)
+
+        return _SCORER
+
+
+def get_model_id() -> str:
+    """Returns an id of the configured BERTScore model, for keying stored scores."""
+    return f"{_MODEL_TYPE}-{_NUM_LAYERS or 'default'}"
+
+
+def compute_bert_scores(predictions: List[str], references: List[List[str]]) -> List[float]:
+    """
+    Computes the BERTScore F1 of each prediction.
+    :param predictions: The predictions.
+    :param references: The references of each prediction.
+    :return: The F1 score of each prediction.
+    """
+    return get_scorer().score([str(prediction) for prediction in predictions],
+                              [[str(ref) for ref in refs] for refs in references])
+
+
+
+def verify_parity(predictions: List[str] = None, references: List[List[str]] = None,
+                  tolerance: float = _PARITY_TOLERANCE) -> bool:
+    """
+    Checks that the scorer matches bert_score.score on a sample.
+    :param predictions: The sample predictions. Defaults to a built-in sample.
+    :param references: The references of each sample prediction.
+    :param tolerance: The maximum allowed difference of each F1 score.
+    :return: Whether all the scores match.
+    """
+    from bert_score import score
+
+    if predictions is None:
+        predictions, references = _PARITY_SAMPLE
+
+    scorer = get_scorer()
+
+    expected = score(predictions, references, model_type=scorer.model_type,
+                     num_layers=scorer.num_layers, batch_size=scorer.batch_size)[2].tolist()
+
+    # bert_score scores empty texts as nan (with a warning); ours are 0.
+    expected = [0.0 if np.isnan(value) else value for value in expected]
+
+    actual = scorer.score(predictions, references)
+
+    mismatches = [(prediction, a, e) for prediction, a, e in zip(predictions, actual, expected)
+                  if abs(a - e) > tolerance]
+
+    for prediction, a, e in mismatches:
+        logging.warning(f"BERTScore mismatch for '{prediction}': {a} != {e} (bert_score)")
+
+    return not mismatches
\ No newline at end of file
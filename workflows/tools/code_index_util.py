@@ -0,0 +1,683 @@
+###############################################################################
+#  Provides a local code index of a cloned workspace for structural code
+#  search: a trigram index which narrows regex searches down to the files
+#  that can match, and a symbol table of the functions and components in
+#  the workspace (Python defs and classes, CFML components and functions).
+#  The index is built once per workspace and only files whose mtime or size
+#  changed are re-indexed afterwards. The workspace is re-scanned at most
+#  every CODE_INDEX_REFRESH_SECONDS, and only directories whose mtime changed
+#  are listed again; the files a search reads are always checked.
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import re
+import ast
+import logging
+import time
+import threading
+from pathlib import PurePath
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_EXTENSIONS = {extension.strip().lower() for extension in
+               os.getenv("CODE_INDEX_EXTENSIONS",
+                         ".py,.cfm,.cfc,.cfml,.js,.ts,.java,.sql,.html,.yaml,.yml,.json,.md").split(",")}
+
+_MAX_FILE_BYTES = int(os.getenv("CODE_INDEX_MAX_FILE_BYTES") or 1024 * 1024)
+
+_SKIPPED_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build"}
+
+_MAX_LINE_LENGTH = 300
+
+_REFRESH_SECONDS = float(os.getenv("CODE_INDEX_REFRESH_SECONDS") or 10)
+
+_INDEXES = {}
+
+_INDEXES_LOCK = threading.Lock()
+
+_CFML_EXTENSIONS = {".cfm", ".cfc", ".cfml"}
+
+_CF_COMPONENT = re.compile(r"<cfcomponent\b[^>]*>|^\s*component\b[^{]*\{", re.IGNORECASE | re.MULTILINE)
+
+_CF_FUNCTION_TAG = re.compile(r"<cffunction\b[^>]*\bname\s*=\s*[\"']([\w.$-]+)[\"'][^>]*>", re.IGNORECASE)
+
+_CF_FUNCTION_TAG_END = re.compile(r"</cffunction\s*>", re.IGNORECASE)
+
+_CF_FUNCTION_SCRIPT = re.compile(r"^\s*(?:(?:public|private|remote|package|static|any|void|string|numeric|"
+                                 r"boolean|struct|array|query|function)\s+)*function\s+([\w$]+)\s*\(",
+                                 re.IGNORECASE | re.MULTILINE)
+
+
+##############################################
+# Index
+##############################################
+@dataclass
+class Symbol:
+    """A function, class or component defined in the workspace."""
+    name: str
+    kind: str
+    path: str
+    start_line: int
+    end_line: int
+
+
+@dataclass
+class IndexedFile:
+    path: str
+    mtime: int
+    size: int
+    trigrams: Set[str] = field(default_factory=set)
+    symbols: List[Symbol] = field(default_factory=list)
+
+
+class CodeIndex:
+    """The trigram index and symbol table of a workspace."""
+
+    def __init__(self, root: str):
+        self.root = os.path.realpath(root)
+        self.files: Dict[str, IndexedFile] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.directories: Dict[str, tuple] = {}
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False):
+        """
+        Indexes new and changed files and drops deleted files. Runs at most
+        every CODE_INDEX_REFRESH_SECONDS unless forced. Directories whose
+        mtime did not change are not listed again; their files are only
+        stat'ed for changes.
+        """
+        with self._lock:
+            if not force and time.monotonic() - self.refreshed_at < _REFRESH_SECONDS:
+                return
+
+            directories, indexed = {}, 0
+
+            pending = [""]
+
+            while pending:
+                directory = pending.pop()
+
+                try:
+                    mtime = os.stat(os.path.join(self.root, directory)).st_mtime_ns
+                except OSError:
+                    continue
+
+                previous = self.directories.get(directory)
+
+                if previous and previous[0] == mtime:
+                    subdirectories, file_names = previous[1], previous[2]
+                else:
+                    subdirectories, file_names = self._list(directory)
+
+                directories[directory] = (mtime, subdirectories, file_names)
+
+                pending.extend(subdirectories)
+
+                for path in file_names:
+                    indexed += self._refresh_file(path)
+
+            seen = {path for _, _, file_names in directories.values() for path in file_names}
+
+            for path in set(self.files) - seen:
+                self._remove(path)
+
+            self.directories, self.refreshed_at = directories, time.monotonic()
+
+            if indexed:
+                logging.info(f"Indexed {indexed} file(s) of {len(self.files)} in '{self.root}'.")
+
+    def refresh_files(self, paths: List[str]):
+        """Re-indexes the given files if they changed since they were indexed."""
+        with self._lock:
+            for path in paths:
+                self._refresh_file(path)
+
+    def _list(self, directory: str) -> tuple:
+        subdirectories, file_names = [], []
+
+        try:
+            entries = list(os.scandir(os.path.join(self.root, directory)))
+        except OSError:
+            return subdirectories, file_names
+
+        for entry in entries:
+            path = os.path.join(directory, entry.name) if directory else entry.name
+
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in _SKIPPED_DIRS:
+                    subdirectories.append(path)
+
+            elif os.path.splitext(entry.name)[1].lower() in _EXTENSIONS:
+                file_names.append(path)
+
+        return subdirectories, file_names
+
+    def _refresh_file(self, path: str) -> int:
+        """Indexes a file if it is new or changed; returns 1 if it was indexed."""
+        try:
+            stat = os.stat(os.path.join(self.root, path))
+        except OSError:
+            self._remove(path)
+
+            return 0
+
+        if stat.st_size > _MAX_FILE_BYTES:
+            self._remove(path)
+
+            return 0
+
+        current = self.files.get(path)
+
+        if current and (current.mtime, current.size) == (stat.st_mtime_ns, stat.st_size):
+            return 0
+
+        self._remove(path)
+
+        self._add(path, stat)
+
+        return 1
+
+    def read_lines(self, path: str) -> List[str]:
+        """Returns the lines of an indexed file."""
+        with open(os.path.join(self.root, path), encoding="utf-8", errors="replace") as file:
+            return file.read().splitlines()
+
+    def candidate_files(self, pattern: str, flags: int = 0) -> List[str]:
+        """
+        Returns the indexed files which can match a regex, using the
+        trigrams of the literal text the regex requires.
+        """
+        trigrams = set()
+
+        for literal in _get_required_literals(pattern, flags):
+            trigrams |= _get_trigrams(literal)
+
+        if not trigrams:
+            return sorted(self.files)
+
+        # Intersect the rarest postings first.
+        candidates = None
+
+        for trigram in sorted(trigrams, key=lambda trigram: len(self.postings.get(trigram, ()))):
+            postings = self.postings.get(trigram, set())
+
+            candidates = postings.copy() if candidates is None else candidates & postings
+
+            if not candidates:
+                return []
+
+        return sorted(candidates)
+
+    def find_symbols(self, name: str, kind: Optional[str] = None) -> List[Symbol]:
+        """Returns the symbols whose name matches the given regex."""
+        pattern = re.compile(name, re.IGNORECASE)
+
+        return [symbol
+                for path in sorted(self.files)
+                for symbol in self.files[path].symbols
+                if pattern.search(symbol.name) and (not kind or symbol.kind == kind)]
+
+    def _add(self, path: str, stat: os.stat_result):
+        try:
+            with open(os.path.join(self.root, path), encoding="utf-8") as file:
+                text = file.read()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        indexed_file = IndexedFile(path, stat.st_mtime_ns, stat.st_size,
+                                   trigrams=_get_trigrams(text),
+                                   symbols=_get_symbols(path, text))
+
+        self.files[path] = indexed_file
+
+        for trigram in indexed_file.trigrams:
+            self.postings.setdefault(trigram, set()).add(path)
+
+    def _remove(self, path: str):
+        indexed_file = self.files.pop(path, None)
+
+        if indexed_file:
+            for trigram in indexed_file.trigrams:
+                postings = self.postings.get(trigram)
+
+                if postings is not None:
+                    postings.discard(path)
+
+                    if not postings:
+                        del self.postings[trigram]
+
+
+##############################################
+# Trigrams
+##############################################
+def _get_trigrams(text: str) -> Set[str]:
+    text = text.lower()
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _get_required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """
+    Returns literal substrings which every match of the regex contains: the
+    runs of literal characters outside groups, character classes and
+    optional repetitions. Patterns with a top-level alternation (ex. "a|b")
+    or in verbose mode yield no literals (and are not narrowed).
+    """
+    if flags & re.VERBOSE:
+        return []
+
+    literals, current, position = [], [], 0
+
+    def end_run():
+        if current:
+            literals.append("".join(current))
+
+        current.clear()
+
+    while position < len(pattern):
+        char = pattern[position]
+
+        if char == "|":
+            return []
+
+        if char in "?*" or (char == "{" and re.match(r"\{0*(,\d*)?\}", pattern[position:])):
+            # The previous character is optional.
+            if current:
+                current.pop()
+
+            end_run()
+
+            position = _skip_quantifier(pattern, position)
+
+            continue
+
+        if char == "+" or (char == "{" and re.match(r"\{\d+(,\d*)?\}", pattern[position:])):
+            # The previous character is required but repeated.
+            end_run()
+
+            position = _skip_quantifier(pattern, position)
+
+            continue
+
+        if char == "\\" and position + 1 < len(pattern):
+            escaped = pattern[position + 1]
+
+            if escaped.isalnum():
+                # Classes, anchors, backreferences and character codes
+                # (ex. \x41) end the run, with their whole payload.
+                end_run()
+
+                position = _skip_escape(pattern, position)
+            else:
+                current.append(escaped)
+
+                position += 2
+
+            continue
+
+        if char == "(":
+            end_run()
+
+            position = _skip_group(pattern, position)
+
+            continue
+
+        if char == "[":
+            end_run()
+
+            position = _skip_class(pattern, position)
+
+            continue
+
+        if char in ".^$)":
+            end_run()
+        else:
+            current.append(char)
+
+        position += 1
+
+    end_run()
+
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def _skip_escape(pattern: str, position: int) -> int:
+    """Returns the position after the alphanumeric escape (and its payload) at the position."""
+    escaped, position = pattern[position + 1], position + 2
+
+    if escaped in "xuU":
+        payload = re.match(r"[0-9a-fA-F]{0,%d}" % {"x": 2, "u": 4, "U": 8}[escaped], pattern[position:])
+
+        return position + payload.end()
+
+    if escaped == "N" and pattern.startswith("{", position):
+        end = pattern.find("}", position)
+
+        return end + 1 if end >= 0 else position
+
+    if escaped == "0":
+        return position + re.match(r"[0-7]{0,2}", pattern[position:]).end()
+
+    if escaped.isdigit():
+        # An octal escape has three octal digits, a backreference one or two digits.
+        if escaped in "1234567" and re.match(r"[0-7]{2}", pattern[position:]):
+            return position + 2
+
+        return position + re.match(r"\d?", pattern[position:]).end()
+
+    return position
+
+
+def _skip_quantifier(pattern: str, position: int) -> int:
+    """Returns the position after the quantifier (and its lazy/possessive suffix) at the position."""
+    if pattern[position] == "{":
+        end = pattern.find("}", position)
+
+        position = end + 1 if end >= 0 else position + 1
+    else:
+        position += 1
+
+    return position + 1 if position < len(pattern) and pattern[position] in "?+" else position
+
+
+def _skip_group(pattern: str, position: int) -> int:
+    """Returns the position after the group opening at the position, and after its quantifier."""
+    depth = 0
+
+    while position < len(pattern):
+        char = pattern[position]
+
+        if char == "\\":
+            position += 2
+
+            continue
+
+        if char == "[":
+            position = _skip_class(pattern, position)
+
+            continue
+
+        if char == "(":
+            depth += 1
+
+        elif char == ")":
+            depth -= 1
+
+            if not depth:
+                position += 1
+
+                break
+
+        position += 1
+
+    if position < len(pattern) and (pattern[position] in "?*+" or pattern[position] == "{"):
+        position = _skip_quantifier(pattern, position)
+
+    return position
+
+
+def _skip_class(pattern: str, position: int) -> int:
+    """Returns the position after the character class opening at the position."""
+    position += 1
+
+    if position < len(pattern) and pattern[position] == "^":
+        position += 1
+
+    # A "]" right after the opening bracket is a literal.
+    if position < len(pattern) and pattern[position] == "]":
+        position += 1
+
+    while position < len(pattern) and pattern[position] != "]":
+        position += 2 if pattern[position] == "\\" else 1
+
+    return position + 1
+
+
+##############################################
+# Symbols
+##############################################
+def _get_symbols(path: str, text: str) -> List[Symbol]:
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == ".py":
+        return _get_python_symbols(path, text)
+
+    if extension in _CFML_EXTENSIONS:
+        return _get_cfml_symbols(path, text)
+
+    return []
+
+
+def _get_python_symbols(path: str, text: str) -> List[Symbol]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+
+    symbols = []
+
+    def visit(node, prefix: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+
+                symbols.append(Symbol(name,
+                                      "class" if isinstance(child, ast.ClassDef) else "function",
+                                      path, child.lineno, child.end_lineno or child.lineno))
+
+                visit(child, f"{name}.")
+
+    visit(tree, "")
+
+    return symbols
+
+
+def _get_cfml_symbols(path: str, text: str) -> List[Symbol]:
+    line_starts = [0] + [match.end() for match in re.finditer("\n", text)]
+
+    def line_of(offset: int) -> int:
+        low, high = 0, len(line_starts)
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if line_starts[middle] <= offset:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    symbols, last_line = [], len(line_starts)
+
+    component = os.path.splitext(os.path.basename(path))[0]
+
+    match = _CF_COMPONENT.search(text)
+
+    if match:
+        symbols.append(Symbol(component, "component", path, line_of(match.start()), last_line))
+
+    for match in _CF_FUNCTION_TAG.finditer(text):
+        end = _CF_FUNCTION_TAG_END.search(text, match.end())
+
+        symbols.append(Symbol(f"{component}.{match.group(1)}", "function", path,
+                              line_of(match.start()), line_of(end.end()) if end else last_line))
+
+    for match in _CF_FUNCTION_SCRIPT.finditer(text):
+        start = match.start() + len(match.group(0)) - len(match.group(0).lstrip())
+
+        symbols.append(Symbol(f"{component}.{match.group(1)}", "function", path,
+                              line_of(start), line_of(_find_block_end(text, match.end()))))
+
+    return symbols
+
+
+def _find_block_end(text: str, offset: int) -> int:
+    """Returns the offset of the brace closing the block which starts after the offset."""
+    start = text.find("{", offset)
+
+    if start < 0:
+        return offset
+
+    depth = 0
+
+    for position in range(start, len(text)):
+        if text[position] == "{":
+            depth += 1
+
+        elif text[position] == "}":
+            depth -= 1
+
+            if not depth:
+                return position
+
+    return len(text) - 1
+
+
+##############################################
+# Search
+##############################################
+def get_code_index(root: str) -> CodeIndex:
+    """Returns the up-to-date code index of a workspace, building it on first use."""
+    key = os.path.realpath(root)
+
+    with _INDEXES_LOCK:
+        if key not in _INDEXES:
+            _INDEXES[key] = CodeIndex(key)
+
+        index = _INDEXES[key]
+
+    index.refresh()
+
+    return index
+
+
+def search_code(root: str, pattern: str, path_glob: str = None, ignore_case: bool = False,
+                context_lines: int = 0, max_results: int = 50) -> str:
+    """
+    Searches the workspace for lines matching a regex.
+    :param root: The workspace directory.
+    :param pattern: The regex to search for.
+    :param path_glob: (Optional) Restricts the search to matching paths, ex. "**/*.cfc".
+    :param ignore_case: Whether the search ignores case.
+    :param context_lines: The number of lines of context around each match.
+    :param max_results: The maximum number of matches to return.
+    :return: The matches as "path:line: text" lines.
+    """
+    if not os.path.isdir(root):
+        return f"Workspace '{root}' does not exist."
+
+    flags = re.IGNORECASE if ignore_case else 0
+
+    try:
+        regex = re.compile(pattern, flags)
+    except re.error as e:
+        return f"Invalid regex '{pattern}': {e}"
+
+    index, results, matches = get_code_index(root), [], 0
+
+    paths = [path for path in index.candidate_files(pattern, flags)
+             if not path_glob or _matches_glob(path, path_glob)]
+
+    # The candidates may have changed since the last scan of the workspace.
+    index.refresh_files(paths)
+
+    for path in paths:
+        if path not in index.files:
+            continue
+
+        lines = index.read_lines(path)
+
+        for number, line in enumerate(lines, start=1):
+            if not regex.search(line):
+                continue
+
+            matches += 1
+
+            if matches > max_results:
+                results.append("[... more matches; narrow the pattern or path_glob ...]")
+
+                return "\n".join(results)
+
+            if context_lines:
+                results.append(format_snippet(path, lines, number - context_lines, number + context_lines))
+            else:
+                results.append(f"{path}:{number}: {_truncate(line)}")
+
+    return "\n".join(results) if results else f"No matches found for '{pattern}'."
+
+
+def find_symbols(root: str, name: str, kind: str = None, max_results: int = 50) -> str:
+    """
+    Looks up functions, classes and components in the workspace symbol table.
+    :param root: The workspace directory.
+    :param name: A regex matched against the (qualified) symbol names.
+    :param kind: (Optional) "function", "class" or "component".
+    :param max_results: The maximum number of symbols to return.
+    :return: The symbols as "kind name path:start-end" lines.
+    """
+    if not os.path.isdir(root):
+        return f"Workspace '{root}' does not exist."
+
+    try:
+        symbols = get_code_index(root).find_symbols(name, kind)
+    except re.error as e:
+        return f"Invalid regex '{name}': {e}"
+
+    results = [f"{symbol.kind} {symbol.name} {symbol.path}:{symbol.start_line}-{symbol.end_line}"
+               for symbol in symbols[:max_results]]
+
+    if len(symbols) > max_results:
+        results.append(f"[... {len(symbols) - max_results} more symbol(s) ...]")
+
+    return "\n".join(results) if results else f"No symbols found for '{name}'."
+
+
+def read_snippet(root: str, path: str, start_line: int, end_line: int) -> str:
+    """
+    Reads a line range of a workspace file.
+    :param root: The workspace directory.
+    :param path: The file path, relative to the workspace.
+    :param start_line: The first line (1-based).
+    :param end_line: The last line (inclusive).
+    :return: The numbered lines.
+    """
+    root = os.path.realpath(root)
+
+    file_path = os.path.realpath(os.path.join(root, path))
+
+    if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+        return f"File '{path}' does not exist in '{root}'."
+
+    with open(file_path, encoding="utf-8", errors="replace") as file:
+        lines = file.read().splitlines()
+
+    return format_snippet(os.path.relpath(file_path, root), lines, start_line, end_line)
+
+
+def format_snippet(path: str, lines: List[str], start_line: int, end_line: int) -> str:
+    """Formats a line range of a file with line numbers."""
+    start_line, end_line = max(int(start_line), 1), min(int(end_line), len(lines))
+
+    body = "\n".join(f"{number:>6}  {_truncate(lines[number - 1])}"
+                     for number in range(start_line, end_line + 1))
+
+    return f"--- {path}:{start_line}-{end_line} ---\n{body}"
+
+
+def _matches_glob(path: str, path_glob: str) -> bool:
+    # PurePath.match does not let "**/" match zero directories.
+    return PurePath(path).match(path_glob) or PurePath(path).match(path_glob.replace("**/", ""))
+
+
+def _truncate(line: str) -> str:
+    return line if len(line) <= _MAX_LINE_LENGTH else f"{line[:_MAX_LINE_LENGTH]} [...]"
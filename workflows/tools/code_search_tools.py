@@ -0,0 +1,95 @@
+"""Tools for searching a cloned workspace by regex and by symbol, returning
+snippets with line ranges instead of whole files."""
+
+from crewai.tools import tool
+from tools import code_index_util
+from pathlib import Path
+import logging
+
+logging.basicConfig(level=logging.INFO)
+
+_LOCAL_PATH = "tmp"
+
+
+def _resolve_workspace(workspace: str):
+    """Returns the resolved workspace, or None if it is outside the base workspace directory."""
+    base = Path(_LOCAL_PATH).resolve()
+
+    resolved = (base.parent / workspace).resolve()
+
+    if not resolved.is_relative_to(base):
+
+        logging.error(f"Workspace '{workspace}' is outside base '{_LOCAL_PATH}'.")
+
+        return None
+
+    return str(resolved)
+
+
+@tool("Search Code")
+def search_code(pattern: str, path_glob: str = None, ignore_case: bool = False,
+                context_lines: int = 0, workspace: str = _LOCAL_PATH) -> str:
+    """Search the workspace for lines matching a regular expression.
+
+    Args:
+        pattern: The regular expression to search for (e.g. "cfquery name=\"\\w+\"").
+        path_glob: Optional glob restricting the searched files (e.g. "**/*.cfc").
+        ignore_case: Whether the search ignores case. Defaults to False.
+        context_lines: Number of lines of context around each match. Defaults to 0.
+        workspace: The workspace directory, "tmp" or a directory in it. Defaults to "tmp".
+
+    Returns:
+        The matching lines as "path:line: text", or numbered snippets if
+        context_lines is set.
+    """
+    root = _resolve_workspace(workspace)
+
+    if root is None:
+        return f"Workspace '{workspace}' is outside '{_LOCAL_PATH}'."
+
+    return code_index_util.search_code(root, pattern, path_glob=path_glob,
+                                       ignore_case=ignore_case, context_lines=context_lines)
+
+
+@tool("Find Symbol")
+def find_symbol(name: str, kind: str = None, workspace: str = _LOCAL_PATH) -> str:
+    """Find functions, classes and components (CFML components and functions, Python defs and classes).
+
+    Args:
+        name: A regular expression matched against the qualified symbol names
+              (e.g. "getUser", "Users\\.").
+        kind: Optional kind of symbol: "function", "class" or "component".
+        workspace: The workspace directory, "tmp" or a directory in it. Defaults to "tmp".
+
+    Returns:
+        The matching symbols as "kind name path:start-end"; read them with
+        "Read Code Snippet".
+    """
+    root = _resolve_workspace(workspace)
+
+    if root is None:
+        return f"Workspace '{workspace}' is outside '{_LOCAL_PATH}'."
+
+    return code_index_util.find_symbols(root, name, kind=kind)
+
+
+@tool("Read Code Snippet")
+def read_code_snippet(path: str, start_line: int, end_line: int,
+                      workspace: str = _LOCAL_PATH) -> str:
+    """Read a line range of a file in the workspace.
+
+    Args:
+        path: The file path, relative to the workspace.
+        start_line: The first line to read (1-based).
+        end_line: The last line to read (inclusive).
+        workspace: The workspace directory, "tmp" or a directory in it. Defaults to "tmp".
+
+    Returns:
+        The numbered lines of the range.
+    """
+    root = _resolve_workspace(workspace)
+
+    if root is None:
+        return f"Workspace '{workspace}' is outside '{_LOCAL_PATH}'."
+
+    return code_index_util.read_snippet(root, path, start_line, end_line)
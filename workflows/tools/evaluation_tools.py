@@ -2,11 +2,30 @@
 evaluations."""
 
 from crewai.tools import tool
-from tools import evaluation_util
+from tools import evaluation_util, benchmark_util, results_util
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+@tool("Read evaluation results")
+def read_evaluation_results(results_path: str,
+                            columns: str = "baseline,candidate,eval_scores_relevancy,eval_reasons_relevancy"):
+    """
+    Reads the Parquet evaluation results saved by the evaluation tools.
+    Args:
+        results_path: The location of the Parquet results, as given in the
+        summary returned by the evaluation tool.
+        columns: Comma-delimited columns to read. Defaults to
+        "baseline,candidate,eval_scores_relevancy,eval_reasons_relevancy".
+    Returns:
+        The rows of the results as a JSON list.
+    """
+    return json.dumps(results_util.read_results(results_path,
+                                                [column.strip() for column in columns.split(",")
+                                                 if column.strip()]).to_pylist(),
+                      default=str)
+
 @tool("Get reference-based evaluation scores")
 def get_reference_based_eval_scores(test_data_file_path: str):
     """
@@ -15,7 +34,8 @@ def get_reference_based_eval_scores(test_data_file_path: str):
     Args:
         test_data_file_path: Path to the test data file.
     Returns:
-        Evaluation results in CSV format.
+        A short summary of the evaluation results and the path of the
+        Parquet results.
     """
     return evaluation_util.compute_reference_based_eval_scores(test_data_file_path)
 
@@ -31,7 +51,8 @@ def get_llm_as_judge_evaluation_scores(test_data_file_path: str,
         Defaults to "REFERENCE".
         threshold: Threshold used to determine a cutoff for evaluations. Defaults to 0.7.
     Returns:
-        Evaluation results in CSV format.
+        A short summary of the evaluation results and the path of the
+        Parquet results.
     """
     return evaluation_util.compute_reference_free_eval_scores(
         test_data_file_path=test_data_file_path,
@@ -49,10 +70,33 @@ def get_benchmark_eval_scores(benchmark_file_path: str,
         model_prefix: Model prefix used to identify the evaluation results. Defaults to "REFERENCE".
         threshold: Threshold used to determine a cutoff for evaluations. Defaults to 0.7.
     Returns:
-        Evaluation results in CSV format.
+        A short summary of the judge and reference-based scores and the
+        path of the Parquet results.
     """
     return evaluation_util.compute_benchmark_eval_scores(benchmark_file_path=benchmark_file_path,
                                                          model_prefix=model_prefix,
                                                          threshold=threshold,
                                                          multiple_rows=True)
 
+
+@tool("Get multi-model benchmark scores")
+def get_multi_model_benchmark_scores(benchmark_file_path: str,
+                                     model_prefixes: str,
+                                     judge_model_prefix: str = "REFERENCE",
+                                     threshold: float = 0.7):
+    """
+    Benchmarks several candidate models at once against the benchmark data in the given file path.
+    Args:
+        benchmark_file_path: Path to the benchmark data file.
+        model_prefixes: Comma-delimited prefixes of the models to benchmark, ex. "CANDIDATE,CODE".
+        judge_model_prefix: Prefix of the model used to score the candidates. Defaults to "REFERENCE".
+        threshold: Threshold used to determine a cutoff for evaluations. Defaults to 0.7.
+    Returns:
+        A comparison table of latency percentiles, tokens per second and scores per model,
+        and the paths of the Parquet results and the comparison CSV.
+    """
+    return benchmark_util.run_multi_model_benchmark(
+        benchmark_file_path=benchmark_file_path,
+        model_prefixes=[prefix.strip() for prefix in model_prefixes.split(",") if prefix.strip()],
+        judge_model_prefix=judge_model_prefix,
+        threshold=threshold)
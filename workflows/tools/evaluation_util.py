@@ -8,47 +8,177 @@
 ##############################################
 import os
 import traceback
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from deepeval.models.base_model import DeepEvalBaseLLM
 from deepeval import assert_test, evaluate
 from deepeval.evaluate import AsyncConfig
 from deepeval.test_case import LLMTestCase, LLMTestCaseParams
 from deepeval.metrics import GEval, AnswerRelevancyMetric
-from evaluate import load
 from deepeval.metrics import ArenaGEval
 from deepeval.test_case import ArenaTestCase
 from deepeval import compare
-import nltk
 import pandas as pd
 import matplotlib.pyplot as plt
 import logging
 logging.basicConfig(level=logging.INFO)
-from data_models.data_models import EvalDetails
+from data_models.data_models import EvalElementDetails
+from tools import bertscore_util, score_store_util, results_util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
 import asyncio
+import sys
+import json
+import time
+import ijson
+from typing import Iterator
+import threading
+import weakref
+import multiprocessing
 
 from dotenv import load_dotenv
 load_dotenv()
 
 ##############################################
-# Set Up Metric Instances
+# Metric Registry
+# Metrics are loaded on first use and cached for
+# the life of the process. Set
+# EVALUATION_ARTIFACTS_DIR to load them from
+# a local artifact directory pre-warmed with
+# prewarm_metrics().
 ##############################################
-nltk.download('wordnet')
-nltk.download('punkt')
-nltk.download('punkt_tab')
-bleu_metric = load("bleu")
-rouge_metric = load("rouge")
-meteor_metric = load("meteor")
-bertscore_metric = load("bertscore")
+_METRIC_NAMES = ["bleu", "rouge", "meteor"]
+
+# The NLTK resources of each metric, with their nltk.data paths.
+_NLTK_RESOURCES = {"meteor": {"wordnet": "corpora/wordnet",
+                              "punkt": "tokenizers/punkt",
+                              "punkt_tab": "tokenizers/punkt_tab"}}
+
+_METRICS = {}
+
+_METRICS_LOCK = threading.Lock()
+
+def get_metric(name: str, artifacts_dir: str = None):
+    """
+    Returns the evaluate metric with the given name, loading it on first use.
+    :param name: The metric name, ex. "bleu".
+    :param artifacts_dir: Local artifact directory for the metric files.
+    Defaults to the EVALUATION_ARTIFACTS_DIR environment variable.
+    :return: The metric instance.
+    """
+    if name in _METRICS:
+        return _METRICS[name]
+
+    with _METRICS_LOCK:
+        if name not in _METRICS:
+            import nltk
+            from evaluate import load
+
+            artifacts_dir = artifacts_dir or os.getenv("EVALUATION_ARTIFACTS_DIR")
+
+            nltk_dir = os.path.join(artifacts_dir, "nltk_data") if artifacts_dir else None
+
+            if nltk_dir and nltk_dir not in nltk.data.path:
+                nltk.data.path.insert(0, nltk_dir)
+
+            for resource, resource_path in _NLTK_RESOURCES.get(name, {}).items():
+                try:
+                    nltk.data.find(resource_path)
+
+                except LookupError:
+                    nltk.download(resource, download_dir=nltk_dir, quiet=True)
+
+            logging.info(f"Loading metric '{name}'...")
+
+            _METRICS[name] = load(name, cache_dir=os.path.join(artifacts_dir, "evaluate")
+                                  if artifacts_dir else None)
+
+        return _METRICS[name]
+
+def load_metrics():
+    """
+    Loads the reference-based metrics (and downloads their NLTK data if
+    missing) in the current process. Call it before starting the scoring
+    pool, so that the workers find the data locally instead of each
+    downloading it.
+    """
+    for name in _METRIC_NAMES:
+        get_metric(name)
+
+def prewarm_metrics(artifacts_dir: str):
+    """
+    Downloads all metrics and their NLTK data into a local artifact
+    directory, so that later runs can load them offline. The BERTScore model
+    is downloaded into the Hugging Face cache (set HF_HOME to keep it in the
+    artifact directory).
+    :param artifacts_dir: The local artifact directory.
+    """
+    for name in _METRIC_NAMES:
+        get_metric(name, artifacts_dir)
+
+    if not bertscore_util.verify_parity():
+        logging.warning("BERTScore scores differ from bert_score.score on the parity sample.")
+
+    logging.info(f"Metrics pre-warmed into {artifacts_dir}.")
 
 
 ##############################################
 # Utilities
 ##############################################
+_TEST_DATA_BATCH_SIZE = int(os.getenv("EVALUATION_BATCH_SIZE") or 1000)
+
 def get_file_content(filepath: str) -> str:
     """Retrieves the contents of a file."""
     with open(filepath, "r") as file:
         return file.read()
 
+def iter_test_records(test_data_file_path: str) -> Iterator[dict]:
+    """
+    Streams the test records of the provided test data file, without loading
+    the whole file into memory. Supports JSON files holding EvalDetails
+    content and JSONL files holding one EvalElementDetails record per line.
+    :param test_data_file_path: Path to the test data source file.
+    :return: An iterator over the test records.
+    """
+    if test_data_file_path.endswith(".jsonl"):
+        with open(test_data_file_path, "r") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(test_data_file_path, "rb") as file:
+            yield from ijson.items(file, "data.item", use_float=True)
+
+def iter_test_record_batches(test_data_file_path: str,
+                             batch_size: int = _TEST_DATA_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Validates the test records of the provided test data file one at a time
+    and yields them in DataFrames of at most batch_size rows. Missing
+    EvalElementDetails fields are left out (not filled with the model
+    defaults). Row indexes continue across batches.
+    :param test_data_file_path: Path to the test data source file.
+    :param batch_size: The maximum number of rows per batch.
+    :return: An iterator over the batches of test records.
+    """
+    batch, offset = [], 0
+
+    for record in iter_test_records(test_data_file_path):
+        # Only the record's own fields are kept: the model defaults (ex.
+        # eval_scores_relevancy=0.0) would be written out as results. Fields
+        # outside EvalElementDetails (ex. the "predictions" and "references"
+        # of reference-based test data) are kept as they are.
+        batch.append({**record, **EvalElementDetails.model_validate(record).model_dump(exclude_unset=True)})
+
+        if len(batch) >= batch_size:
+            yield _get_batch_dataframe(batch, offset)
+
+            batch, offset = [], offset + len(batch)
+
+    if batch:
+        yield _get_batch_dataframe(batch, offset)
+
+def _get_batch_dataframe(batch: list, offset: int) -> pd.DataFrame:
+    return pd.DataFrame(batch, index=pd.RangeIndex(offset, offset + len(batch)))
+
 def get_test_records_as_dataframe(test_data_file_path: str):
     """
     Converts the provided test data file into a Dataframe of test records.
@@ -57,15 +187,12 @@ def get_test_records_as_dataframe(test_data_file_path: str):
     """
 
     try:
-        file_content = get_file_content(test_data_file_path)
-
-        EvalDetails.model_validate_json(file_content)
-
-        df = pd.read_json(test_data_file_path).fillna("")
+        batches = list(iter_test_record_batches(test_data_file_path))
 
-        df = pd.json_normalize(df['data'])
+        if not batches:
+            return pd.DataFrame(columns=list(EvalElementDetails.model_fields))
 
-        return df
+        return pd.concat(batches)
 
     except Exception as e:
         logging.error(f"Could not extract data: {e}")
@@ -75,106 +202,330 @@ def get_test_records_as_dataframe(test_data_file_path: str):
 ##############################################
 # Evaluator Tools
 ##############################################
+_JUDGE_MAX_CONCURRENT = int(os.getenv("JUDGE_MAX_CONCURRENT") or 10)
+
+_JUDGE_REQUESTS_PER_SECOND = float(os.getenv("JUDGE_REQUESTS_PER_SECOND") or 0)
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by the sync and async judge calls.
+    A rate of 0 disables rate limiting.
+    """
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes a token and returns how long to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        if self.rate > 0:
+            time.sleep(self._reserve())
+
+    async def a_acquire(self):
+        if self.rate > 0:
+            await asyncio.sleep(self._reserve())
+
 class CustomLLM(DeepEvalBaseLLM):
-    def __init__(self, client, model_name):
+    def __init__(self, client, model_name, async_client_args=None, rate_limiter=None):
         self.client = client
+        self.async_client_args = async_client_args
         self.model_name = model_name
+        self.rate_limiter = rate_limiter or TokenBucket(rate=0)
+        # An async client's connections are bound to the event loop which
+        # opened them, so each loop (ex. of each evaluate call) gets its own.
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
+
+    def get_async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            if loop not in self._async_clients:
+                self._async_clients[loop] = AsyncOpenAI(**self.async_client_args)
+            return self._async_clients[loop]
 
     def load_model(self):
         return self.client
 
-    def generate(self, prompt: str, schema=None):
+    def build_request(self, prompt: str, schema=None) -> dict:
+        request = {"model": self.model_name,
+                   "messages": [{"role": "user", "content": prompt}],
+                   "temperature": 0}
         if schema:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                response_format={"type": "json_object"}
-            )
-            return schema.model_validate_json(response.choices[0].message.content)
-        response = self.client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0
-        )
-        return response.choices[0].message.content
+            request["response_format"] = {"type": "json_object"}
+        return request
+
+    def _parse_response(self, response, schema=None):
+        content = response.choices[0].message.content
+        return schema.model_validate_json(content) if schema else content
+
+    def generate(self, prompt: str, schema=None):
+        self.rate_limiter.acquire()
+        response = self.client.chat.completions.create(**self.build_request(prompt, schema))
+        return self._parse_response(response, schema)
 
     async def a_generate(self, prompt: str, schema=None):
-        return self.generate(prompt, schema=schema)
+        if self.async_client_args is None:
+            return self.generate(prompt, schema=schema)
+        await self.rate_limiter.a_acquire()
+        response = await self.get_async_client().chat.completions.create(**self.build_request(prompt, schema))
+        return self._parse_response(response, schema)
 
     def get_model_name(self):
         return self.model_name
 
+_JUDGE_LLMS = {}
+
+_JUDGE_LLMS_LOCK = threading.Lock()
+
+def get_judge_llm(model_prefix: str) -> CustomLLM:
+    """
+    Returns the shared LLM-as-judge model for the given model prefix,
+    building it on first use. Its sync client and its async clients (one
+    per event loop) share one rate limiter (JUDGE_REQUESTS_PER_SECOND), so
+    the limit holds across all the evaluations of the process.
+    """
+    with _JUDGE_LLMS_LOCK:
+        if model_prefix not in _JUDGE_LLMS:
+            client_args = {"api_key": os.getenv(f"{model_prefix}_LLM_TOKEN"),
+                           "base_url": os.getenv(f"{model_prefix}_LLM_API_BASE")}
+
+            _JUDGE_LLMS[model_prefix] = CustomLLM(client=OpenAI(**client_args),
+                                                  async_client_args=client_args,
+                                                  model_name=os.getenv(f"{model_prefix}_LLM_ID"),
+                                                  rate_limiter=TokenBucket(rate=_JUDGE_REQUESTS_PER_SECOND))
+
+        return _JUDGE_LLMS[model_prefix]
+
 
 ##############################################
 # Reference-Based Evaluation Methods
 # using standard metrics from the
 # evaluate framework
 ##############################################
-def compute_reference_based_eval_scores(test_data_file_path: str):
+_REFERENCE_METRICS = ["bleu4", "rougel", "meteor", "bert"]
+
+# Part of the stored row score keys; bump it when the scoring changes.
+_REFERENCE_SCORES_VERSION = 2
+
+_SCORE_WORKERS = int(os.getenv("EVALUATION_SCORE_WORKERS") or os.cpu_count() or 1)
+
+def compute_row_scores(predictions: list, references: list) -> list:
     """
-    Computes the reference based evaluation scores.
-    :param test_data_file_path: Path to the test data source file.
-    :return: The reference based evaluation scores in CSV format.
+    Computes the sentence-level BLEU-4 (smoothed), ROUGE-L and METEOR scores
+    of each row of a chunk. Runs in the worker processes of the scoring pool.
+    The metrics' scoring functions are called directly, without the input
+    validation and Arrow caching of evaluate's compute, and ROUGE-L is
+    scored for the whole chunk at once. Rows with an empty prediction or
+    without non-empty references score 0.
+    """
+    scores = [{"bleu4": 0.0, "rougel": 0.0, "meteor": 0.0} for _ in predictions]
+
+    references = [[ref for ref in refs if ref.strip()] for refs in references]
+
+    rows = [index for index, (prediction, refs) in enumerate(zip(predictions, references))
+            if prediction.strip() and refs]
+
+    if not rows:
+        return scores
+
+    rouge_scores = get_metric("rouge")._compute(predictions=[predictions[index] for index in rows],
+                                                references=[references[index] for index in rows],
+                                                use_aggregator=False)["rougeL"]
+
+    for index, rougel in zip(rows, rouge_scores):
+        prediction, refs = [predictions[index]], [references[index]]
+
+        scores[index] = {
+            "bleu4": get_metric("bleu")._compute(predictions=prediction, references=refs, smooth=True)["bleu"],
+            "rougel": float(rougel),
+            "meteor": get_metric("meteor")._compute(predictions=prediction, references=refs)["meteor"],
+        }
+
+    return scores
+
+def aggregate_row_scores(scores: pd.DataFrame) -> dict:
+    """
+    Derives the corpus-level scores (the mean of each metric) from the
+    per-row scores.
+    """
+    return scores.mean(numeric_only=True).to_dict()
+
+def score_reference_based_batch(data: pd.DataFrame, executor: ProcessPoolExecutor,
+                                prediction_column: str = "predictions",
+                                reference_column: str = "references") -> pd.DataFrame:
     """
-    def compute_bleu4_scores(predictions, references):
-        """
-        Computes BLEU-4 Scores
-        """
-        results = bleu_metric.compute(predictions=predictions, references=references)
-        return results["bleu"]
+    Computes the reference based evaluation scores of each row of a batch.
+    Row scores are stored by content hash, so only new or changed rows are
+    scored; the rest are read from the score store.
+    :param data: The batch of test records.
+    :param executor: The process pool used to score the rows.
+    :param prediction_column: The column holding the predictions.
+    :param reference_column: The column holding the references.
+    :return: The scores of each row.
+    """
+    predictions = [str(prediction) for prediction in data[prediction_column]]
+
+    references = [[str(ref) for ref in reference] if isinstance(reference, list) else [str(reference)]
+                  for reference in data[reference_column]]
+
+    keys = [score_store_util.get_content_hash(prediction, refs, bertscore_util.get_model_id(),
+                                              _REFERENCE_SCORES_VERSION)
+            for prediction, refs in zip(predictions, references)]
+
+    store = score_store_util.get_score_store("reference_based_scores")
+
+    row_scores = store.get_many(keys)
+
+    pending = {key: index for index, key in enumerate(keys) if key not in row_scores}
+
+    logging.info(f"Scoring {len(pending)} of {len(keys)} row(s); the rest are unchanged.")
+
+    if pending:
+        pending_predictions = [predictions[index] for index in pending.values()]
+
+        pending_references = [references[index] for index in pending.values()]
 
-    def compute_rouge_scores(predictions, references):
-        """
-        Computes ROUGE Scores
-        """
-        results = rouge_metric.compute(predictions=predictions, references=references)
-        return results["rougeL"]
+        chunk_size = max(1, len(pending) // (_SCORE_WORKERS * 4))
 
-    def compute_meteor_scores(predictions, references):
-        """
-        Computes METEOR Scores
-        """
-        results = meteor_metric.compute(predictions=predictions, references=references)
-        return results["meteor"]
+        chunks = range(0, len(pending), chunk_size)
 
+        scores = [score for chunk_scores in executor.map(compute_row_scores,
+                                                         [pending_predictions[start:start + chunk_size]
+                                                          for start in chunks],
+                                                         [pending_references[start:start + chunk_size]
+                                                          for start in chunks])
+                  for score in chunk_scores]
 
-    def compute_bert_scores(predictions, references):
-        """
-        Computes BERT Scores
-        """
-        results = bertscore_metric.compute(predictions=predictions, references=references, lang="en")
-        return results["f1"]
+        bert_scores = bertscore_util.compute_bert_scores(pending_predictions, pending_references)
 
-    data = get_test_records_as_dataframe(test_data_file_path)
+        new_scores = {key: {**score, "bert": bert_score}
+                      for key, score, bert_score in zip(pending, scores, bert_scores)}
 
-    predictions = data["predictions"].tolist()
+        store.put_many(new_scores)
 
-    references = data["references"].tolist()
+        row_scores.update(new_scores)
 
-    references = [[reference] for reference in references]
+    return pd.DataFrame([{f"{metric}_score": row_scores[key][metric] for metric in _REFERENCE_METRICS}
+                         for key in keys], index=data.index)
 
-    results = {
-        "bleu4": compute_bleu4_scores(predictions, references),
-        "rougel": compute_rouge_scores(predictions, references),
-        "meteor": compute_meteor_scores(predictions, references),
-        "bert": compute_bert_scores(predictions, references)
-    }
+def compute_reference_based_eval_scores(test_data_file_path: str, run_id: str = None):
+    """
+    Computes the reference based evaluation scores of each row, streaming
+    the test data in bounded-size batches.
+    :param test_data_file_path: Path to the test data source file.
+    :param run_id: The evaluation run id. Defaults to a new run id.
+    :return: A summary of the scores and the path of the Parquet results.
+    """
+    writer, eval_dfs = results_util.ResultWriter("reference_based", run_id=run_id), []
+
+    load_metrics()
+
+    with ProcessPoolExecutor(max_workers=_SCORE_WORKERS) as executor:
+        for data in iter_test_record_batches(test_data_file_path):
+            eval_df = score_reference_based_batch(data, executor)
 
-    results = {f"{key}_{suffix}": value.get(suffix) for suffix in ['score', 'reason'] for key, value in results.items() }
+            data[eval_df.columns.tolist()] = eval_df
 
-    eval_df = pd.DataFrame(results, index=data.index)
+            writer.write(data)
 
-    data[eval_df.columns.tolist()] = eval_df
+            eval_dfs.append(eval_df)
 
-    return data.to_csv()
+    corpus_scores = aggregate_row_scores(pd.concat(eval_dfs)) if eval_dfs else {}
+
+    logging.info(f"Corpus scores: {corpus_scores}")
+
+    return writer.summary(corpus_scores)
 
 ##############################################
 # Reference-Free Evaluation Methods
 ##############################################
+async def a_judge_test_cases(test_cases: list, model_prefix: str, threshold: float) -> list:
+    """
+    Scores the test cases with the AnswerRelevancyMetric concurrently, up to
+    JUDGE_MAX_CONCURRENT at a time, under the rate limiter of the judge
+    model. The metrics are measured directly rather than with DeepEval's
+    evaluate, which records into a global test run, so concurrent callers
+    (ex. benchmark shards) don't have to take turns.
+    :param test_cases: The test cases.
+    :param model_prefix: The prefix of the judge model name.
+    :param threshold: The threshold to use for computing scores.
+    :return: The [score, reason] verdict of each test case, in order.
+    """
+    semaphore = asyncio.Semaphore(_JUDGE_MAX_CONCURRENT)
+
+    async def judge(test_case: LLMTestCase) -> list:
+        # Metrics hold the state of their last measurement, so each test
+        # case gets its own.
+        metric = AnswerRelevancyMetric(threshold=threshold,
+                                       model=get_judge_llm(model_prefix),
+                                       verbose_mode=False,
+                                       async_mode=True)
+
+        async with semaphore:
+            await metric.a_measure(test_case, _show_indicator=False,
+                                   _log_metric_to_confident=False)
+
+        return [metric.score, metric.reason]
+
+    return await asyncio.gather(*(judge(test_case) for test_case in test_cases))
+
+def judge_answer_relevancy(baselines: list, candidates: list,
+                           model_prefix: str, threshold: float) -> list:
+    """
+    Scores the relevancy of each candidate to its baseline with the
+    AnswerRelevancyMetric. Verdicts are stored by (metric name, threshold,
+    judge model id, baseline hash, candidate hash), so only new or changed
+    pairs are sent to the judge model.
+    :param baselines: The baselines (inputs) of each pair.
+    :param candidates: The candidates (actual outputs) of each pair.
+    :param model_prefix: The prefix of the judge model name.
+    :param threshold: The threshold to use for computing scores.
+    :return: The (score, reason) verdict of each pair.
+    """
+    metric_name = "Answer Relevancy"
+
+    judge_model_id = os.getenv(f"{model_prefix}_LLM_ID")
+
+    test_cases = [LLMTestCase(input=str(baseline), actual_output=str(candidate))
+                  for baseline, candidate in zip(baselines, candidates)]
+
+    keys = [score_store_util.get_content_hash(metric_name, threshold, judge_model_id,
+                                              score_store_util.get_content_hash(case.input),
+                                              score_store_util.get_content_hash(case.actual_output))
+            for case in test_cases]
+
+    store = score_store_util.get_score_store("judge_verdicts")
+
+    verdicts = store.get_many(keys)
+
+    pending = {key: case for key, case in zip(keys, test_cases) if key not in verdicts}
+
+    logging.info(f"Judging {len(pending)} of {len(keys)} pair(s); the rest have stored verdicts.")
+
+    if pending:
+        new_verdicts = dict(zip(pending, asyncio.run(a_judge_test_cases(list(pending.values()),
+                                                                         model_prefix, threshold))))
+
+        store.put_many(new_verdicts)
+
+        verdicts.update(new_verdicts)
+
+    return [tuple(verdicts[key]) for key in keys]
+
 def compute_reference_free_eval_scores(test_data_file_path: str,
                                        model_prefix: str,
-                                       threshold: float = 0.7):
+                                       threshold: float = 0.7,
+                                       run_id: str = None):
     """
     Computes reference-free evaluation scores based on test data using
     DeepEval framework and LLM-as-Judge metrics.
@@ -182,40 +533,31 @@ def compute_reference_free_eval_scores(test_data_file_path: str,
     :param test_data_file_path: Test data file path.
     :param model_prefix: The prefix of the model name.
     :param threshold: The threshold to use for computing scores.
-    :return: CSV-formatted version of the dataframe containing the scores.
+    :param run_id: The evaluation run id. Defaults to a new run id.
+    :return: A summary of the scores and the path of the Parquet results.
     """
     try:
 
-        data = get_test_records_as_dataframe(test_data_file_path)
-
-        records = data.to_dict(orient='records')
+        writer, scores = results_util.ResultWriter("answer_relevancy", run_id=run_id), []
 
-        evaluatorLlm = CustomLLM(client = OpenAI(
-            api_key=os.getenv(f"{model_prefix}_LLM_TOKEN"),
-            base_url=os.getenv(f"{model_prefix}_LLM_API_BASE")),
-            model_name = os.getenv(f"{model_prefix}_LLM_ID"))
+        for data in iter_test_record_batches(test_data_file_path):
 
-        test_cases = [LLMTestCase(input=str(record["baseline"]),
-                                  actual_output=str(record["candidate"]))
-                      for record in records]
+            verdicts = judge_answer_relevancy(data["baseline"].tolist(),
+                                              data["candidate"].tolist(),
+                                              model_prefix,
+                                              threshold)
 
-        metrics = [AnswerRelevancyMetric(threshold=threshold,
-                                         model=evaluatorLlm,
-                                         verbose_mode=False,
-                                         async_mode=False)]
+            data["eval_scores_relevancy"] = [float(score) for score, _ in verdicts]
 
-        results = evaluate(test_cases=test_cases, metrics=metrics,
-                           async_config=AsyncConfig(run_async=False))
+            data["eval_reasons_relevancy"] = [str(reason) for _, reason in verdicts]
 
-        result_scores_relevancy = [metric.score for result in results.test_results for metric in result.metrics_data if metric.name=="Answer Relevancy"]
+            writer.write(data)
 
-        result_reasons_relevancy = [metric.reason for result in results.test_results for metric in result.metrics_data if metric.name=="Answer Relevancy"]
+            scores.extend(data["eval_scores_relevancy"])
 
-        data["eval_scores_relevancy"] = result_scores_relevancy
-
-        data["eval_reasons_relevancy"] = result_reasons_relevancy
-
-        return data.to_csv()
+        return writer.summary({"mean_relevancy": sum(scores) / len(scores),
+                               "pass_rate": sum(score >= threshold for score in scores) / len(scores)}
+                              if scores else {})
 
     except Exception as e:
         logging.error(f"Error processing evaluations from {test_data_file_path}: {e}")
@@ -225,9 +567,52 @@ def compute_reference_free_eval_scores(test_data_file_path: str,
 ##############################################
 # Benchmark Evaluation Methods
 ##############################################
+_BENCHMARK_WORKERS = int(os.getenv("BENCHMARK_WORKERS") or 4)
+
+_BENCHMARK_SHARD_SIZE = int(os.getenv("BENCHMARK_SHARD_SIZE") or 100)
+
+def score_benchmark_shard(data: pd.DataFrame, model_prefix: str, threshold: float,
+                          executor: ProcessPoolExecutor) -> pd.DataFrame:
+    """
+    Scores a shard of benchmark rows with the judge metric and the rows
+    which have references with the reference-based metrics (the other rows
+    get no reference-based scores).
+    :param data: The shard of benchmark rows.
+    :param model_prefix: The prefix of the judge model name.
+    :param threshold: The threshold to use for computing scores.
+    :param executor: The process pool used for the reference-based scores.
+    :return: The shard with its scores.
+    """
+    verdicts = judge_answer_relevancy(data["baseline"].tolist(),
+                                      data["candidate"].tolist(),
+                                      model_prefix,
+                                      threshold)
+
+    data["eval_scores_relevancy"] = [float(score) for score, _ in verdicts]
+
+    data["eval_reasons_relevancy"] = [str(reason) for _, reason in verdicts]
+
+    if "reference" not in data:
+        return data
+
+    has_references = pd.Series([any(str(ref).strip() for ref in
+                                    (reference if isinstance(reference, list) else [reference]))
+                                for reference in data["reference"]], index=data.index)
+
+    if has_references.any():
+        eval_df = score_reference_based_batch(data[has_references], executor,
+                                              prediction_column="candidate",
+                                              reference_column="reference")
+
+        data[eval_df.columns.tolist()] = eval_df.reindex(data.index)
+
+    return data
+
 def compute_benchmark_eval_scores(benchmark_file_path: str,
                                   model_prefix: str,
-                                  threshold: float):
+                                  threshold: float,
+                                  multiple_rows: bool = False,
+                                  run_id: str = None):
     """
     Computes benchmark evaluation scores based on test data using
     DeepEval framework and LLM-as-Judge metrics.
@@ -235,15 +620,73 @@ def compute_benchmark_eval_scores(benchmark_file_path: str,
     baseline: Represents data that will be used as a baseline for the
     evaluation, ex. input questions, context data, etc.
     candidate: Represents the data to be evaluated in CSV format.
+    reference: (Optional) Represents the references used for the
+    reference-based metrics.
+    If multiple_rows is True, the benchmark file is split into shards of
+    BENCHMARK_SHARD_SIZE rows which are scored concurrently by
+    BENCHMARK_WORKERS workers, with both the judge and the reference-based
+    metrics; the results are written in the order of the benchmark file.
+    The judge calls of all the shards run concurrently under the shared rate
+    limiter, and the reference-based metrics in a shared process pool;
+    BERTScore scores one shard at a time, as its model is shared.
     """
     try:
 
-        return compute_reference_free_eval_scores(benchmark_file_path,
-                                                  model_prefix,
-                                                  threshold=threshold)
+        if not multiple_rows:
+
+            return compute_reference_free_eval_scores(benchmark_file_path,
+                                                      model_prefix,
+                                                      threshold=threshold,
+                                                      run_id=run_id)
+
+        writer, eval_dfs, pending = results_util.ResultWriter("benchmark", run_id=run_id), [], deque()
+
+        load_metrics()
+
+        def write_next_shard():
+            data = pending.popleft().result()
+
+            writer.write(data)
+
+            eval_dfs.append(data[[column for column in data.columns
+                                  if column == "eval_scores_relevancy" or column.endswith("_score")]])
+
+        # The scoring pool starts its workers on first use, from a shard
+        # thread; they are spawned rather than forked from the threaded
+        # process, and load the metrics on start.
+        with ThreadPoolExecutor(max_workers=_BENCHMARK_WORKERS) as executor, \
+                ProcessPoolExecutor(max_workers=_SCORE_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=load_metrics) as score_executor:
+
+            for data in iter_test_record_batches(benchmark_file_path, batch_size=_BENCHMARK_SHARD_SIZE):
+
+                pending.append(executor.submit(score_benchmark_shard, data, model_prefix,
+                                               threshold, score_executor))
+
+                # Bound the number of shards held in memory.
+                if len(pending) >= _BENCHMARK_WORKERS * 2:
+                    write_next_shard()
+
+            while pending:
+                write_next_shard()
+
+        if not eval_dfs:
+            return writer.summary()
+
+        eval_df = pd.concat(eval_dfs)
+
+        relevancy = eval_df.pop("eval_scores_relevancy")
+
+        return writer.summary({"mean_relevancy": relevancy.mean(),
+                               "pass_rate": (relevancy >= threshold).mean(),
+                               **(aggregate_row_scores(eval_df) if len(eval_df.columns) else {})})
 
     except Exception as e:
         logging.error(f"Error processing benchmark evaluations from {benchmark_file_path}: {e}")
 
         logging.error(traceback.format_exc())
 
+if __name__ == "__main__":
+    prewarm_metrics(sys.argv[1] if len(sys.argv) > 1
+                    else os.getenv("EVALUATION_ARTIFACTS_DIR", "eval_artifacts"))
@@ -0,0 +1,240 @@
+###############################################################################
+#  Provides process-wide caches for the file tools: an LRU cache of file
+#  contents keyed by (resolved path, mtime, size, inode), and an index of the
+#  files matching each glob of a directory, which is rebuilt when the mtime
+#  of any directory the glob can match in changes.
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Callable, List
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_CACHE_ENABLED = os.getenv("FILE_CACHE_ENABLED", "true").lower() == "true"
+
+_CACHE_MAX_BYTES = int(os.getenv("FILE_CACHE_MAX_BYTES") or 64 * 1024 * 1024)
+
+_GLOB_INDEX_MAX_ENTRIES = int(os.getenv("FILE_GLOB_INDEX_MAX_ENTRIES") or 256)
+
+_FILE_CACHE = None
+
+_GLOB_INDEX = None
+
+_LOCK = threading.Lock()
+
+
+##############################################
+# File Content Cache
+##############################################
+class FileContentCache:
+    """
+    An in-memory LRU cache of file contents, bounded by the total length
+    (in characters) of the cached contents. A file is keyed by its resolved
+    path, mtime, size and inode, so modified or replaced files are read
+    again.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, reader: Callable[[Path], str], variant=None) -> str:
+        """
+        Returns the contents of a file, reading it with the reader on a miss.
+        :param path: The resolved file path.
+        :param reader: Reads the contents of the file.
+        :param variant: Distinguishes different reads of the same file, ex. a
+        byte limit.
+        :return: The file contents.
+        """
+        stat = path.stat()
+
+        key = (str(path), stat.st_mtime_ns, stat.st_size, stat.st_ino, variant)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+                self.stats["hits"] += 1
+
+                return self._entries[key]
+
+            self.stats["misses"] += 1
+
+        content = reader(path)
+
+        self._put(key, content)
+
+        return content
+
+    def get_stats(self) -> dict:
+        """Returns the hit/miss counts and the size of the cache."""
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self.bytes}
+
+    def _put(self, key: tuple, content: str):
+        size = len(content)
+
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Drop the entries of older versions of the same file and read.
+            stale = self._keys.pop((key[0], key[-1]), None)
+
+            if stale in self._entries:
+                self.bytes -= len(self._entries.pop(stale))
+
+            self._entries[key] = content
+
+            self._keys[(key[0], key[-1])] = key
+
+            self.bytes += size
+
+            while self.bytes > self.max_bytes:
+                evicted, evicted_content = self._entries.popitem(last=False)
+
+                self._keys.pop((evicted[0], evicted[-1]), None)
+
+                self.bytes -= len(evicted_content)
+
+
+##############################################
+# Glob Index
+##############################################
+class GlobIndex:
+    """
+    An LRU index of the sorted files matching a glob pattern in a directory.
+    The mtimes of the directories the pattern can match in are recorded
+    with the files, and the files are globbed again once any of them change.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, search_dir: Path, pattern: str) -> List[Path]:
+        """
+        Returns the sorted paths matching the pattern in the directory.
+        :param search_dir: The resolved directory to search in.
+        :param pattern: The glob pattern to match.
+        :return: The matching paths.
+        """
+        key = (str(search_dir), pattern)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry and self._is_current(entry[0]):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+
+                self.stats["hits"] += 1
+
+            return entry[1]
+
+        # Record the mtimes before globbing, so that changes made while
+        # globbing invalidate the entry.
+        dir_mtimes = self._get_dir_mtimes(search_dir, pattern)
+
+        paths = sorted(search_dir.glob(pattern))
+
+        with self._lock:
+            self.stats["misses"] += 1
+
+            self._entries[key] = (dir_mtimes, paths)
+
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return paths
+
+    def get_stats(self) -> dict:
+        """Returns the hit/miss counts and the size of the index."""
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+    def _get_dir_mtimes(self, search_dir: Path, pattern: str) -> dict:
+        # Recursive patterns can match in any subdirectory; other patterns
+        # only as deep as their number of path components.
+        max_depth = None if "**" in pattern else pattern.count("/")
+
+        dir_mtimes = {}
+
+        for dir_path, dir_names, _ in os.walk(search_dir):
+            dir_mtimes[dir_path] = os.stat(dir_path).st_mtime_ns
+
+            depth = len(Path(dir_path).relative_to(search_dir).parts)
+
+            if max_depth is not None and depth >= max_depth:
+                dir_names.clear()
+
+        return dir_mtimes
+
+    def _is_current(self, dir_mtimes: dict) -> bool:
+        try:
+            return all(os.stat(dir_path).st_mtime_ns == mtime
+                       for dir_path, mtime in dir_mtimes.items())
+        except OSError:
+            return False
+
+
+##############################################
+# Accessors
+##############################################
+def get_file_cache() -> FileContentCache:
+    """Returns the process-wide file content cache, or None if it is disabled."""
+    global _FILE_CACHE
+
+    if not _CACHE_ENABLED:
+        return None
+
+    with _LOCK:
+        if _FILE_CACHE is None:
+            _FILE_CACHE = FileContentCache(_CACHE_MAX_BYTES)
+
+        return _FILE_CACHE
+
+
+def get_glob_index() -> GlobIndex:
+    """Returns the process-wide glob index, or None if it is disabled."""
+    global _GLOB_INDEX
+
+    if not _CACHE_ENABLED:
+        return None
+
+    with _LOCK:
+        if _GLOB_INDEX is None:
+            _GLOB_INDEX = GlobIndex(_GLOB_INDEX_MAX_ENTRIES)
+
+        return _GLOB_INDEX
+
+
+def read_cached(path: Path, reader: Callable[[Path], str], variant=None) -> str:
+    """Reads a file through the content cache, if it is enabled."""
+    cache = get_file_cache()
+
+    return cache.get(path, reader, variant) if cache else reader(path)
+
+
+def glob_cached(search_dir: Path, pattern: str) -> List[Path]:
+    """Returns the sorted paths matching a glob through the glob index, if it is enabled."""
+    index = get_glob_index()
+
+    return index.get(search_dir, pattern) if index else sorted(search_dir.glob(pattern))
@@ -3,12 +3,135 @@
 from crewai.tools import tool
 from crewai_tools import FileReadTool
 from pathlib import Path
+import os
+import mmap
+import codecs
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import json
 import jsonpath_ng.ext as jsonpath
+from tools import file_cache_util
 
 logging.basicConfig(level=logging.INFO)
 
+from dotenv import load_dotenv
+load_dotenv()
+
+# Page budgets of read_files_by_pattern. Tokens are estimated from bytes.
+_MAX_PAGE_BYTES = int(os.getenv("FILE_TOOLS_MAX_PAGE_BYTES") or 200_000)
+
+_MAX_FILE_BYTES = int(os.getenv("FILE_TOOLS_MAX_FILE_BYTES") or 50_000)
+
+_BYTES_PER_TOKEN = 4
+
+# Files at least this large are read through mmap.
+_MMAP_THRESHOLD = 1024 * 1024
+
+# Sizes of the compiled JSONPath and parsed JSON document caches.
+_JSONPATH_CACHE_SIZE = int(os.getenv("JSONPATH_CACHE_SIZE") or 256)
+
+_JSON_DOCUMENT_CACHE_SIZE = int(os.getenv("JSON_DOCUMENT_CACHE_SIZE") or 16)
+
+_JSON_DOCUMENTS = OrderedDict()
+
+_JSON_DOCUMENTS_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=_JSONPATH_CACHE_SIZE)
+def compile_json_path(json_path: str):
+    """Compile a JSONPath expression, reusing previously compiled expressions."""
+    return jsonpath.parse(json_path)
+
+
+def load_json_document(json_string: str):
+    """Parse a JSON string, reusing the parsed document of identical strings.
+
+    Documents are keyed by a hash of the string and the least recently used
+    documents are evicted. Parsed documents are shared, so callers must not
+    modify them.
+
+    Args:
+        json_string: A valid JSON string.
+
+    Returns:
+        The parsed document.
+    """
+    key = hashlib.blake2b(json_string.encode("utf-8"), digest_size=16).digest()
+
+    with _JSON_DOCUMENTS_LOCK:
+        if key in _JSON_DOCUMENTS:
+            _JSON_DOCUMENTS.move_to_end(key)
+
+            return _JSON_DOCUMENTS[key]
+
+    data = json.loads(json_string)
+
+    with _JSON_DOCUMENTS_LOCK:
+        _JSON_DOCUMENTS[key] = data
+
+        while len(_JSON_DOCUMENTS) > _JSON_DOCUMENT_CACHE_SIZE:
+            _JSON_DOCUMENTS.popitem(last=False)
+
+    return data
+
+
+def extract_json_path(json_string: str, json_path: str) -> str:
+    """Extract data from a JSON string using a JSONPath expression.
+
+    Args:
+        json_string: A valid JSON string to query.
+        json_path: A JSONPath expression (e.g. "$.doc_detail.file_name").
+
+    Returns:
+        The matched value(s) as a string, or an empty string if not found.
+    """
+    return extract_json_paths(json_string, [json_path])[json_path]
+
+
+def extract_json_paths(json_string: str, json_paths: list) -> dict:
+    """Extract data from a JSON string using several JSONPath expressions.
+
+    The JSON string is parsed once for all of the expressions.
+
+    Args:
+        json_string: A valid JSON string to query.
+        json_paths: The JSONPath expressions (e.g. ["$.doc_detail.file_name",
+                    "$.doc_detail.result_content"]).
+
+    Returns:
+        The matched value(s) of each expression as a string, or an empty
+        string if not found.
+    """
+    try:
+        data = load_json_document(json_string)
+
+    except Exception as e:
+        logging.error(f"Error parsing JSON from {json_string}: {e}")
+        return {json_path: "" for json_path in json_paths}
+
+    results = {}
+
+    for json_path in json_paths:
+        try:
+            expr = compile_json_path(json_path)
+
+            matches = [match.value for match in expr.find(data)]
+
+            if not matches:
+
+                raise Exception(f"No matches found for '{json_path}' in '{json_string}'.")
+
+            results[json_path] = str(matches[0]) if len(matches) == 1 else str(matches)
+
+        except Exception as e:
+            logging.error(f"Error parsing '{json_path}' from {json_string}: {e}")
+            results[json_path] = ""
+
+    return results
+
 
 @tool("Query JSON String")
 def query_json_string(json_string: str, json_path: str) -> str:
@@ -22,36 +145,75 @@ def query_json_string(json_string: str, json_path: str) -> str:
     Returns:
         The matched value(s) as a string, or an empty string if not found.
     """
-    try:
-        data = json.loads(json_string)
+    return extract_json_path(json_string, json_path)
 
-        expr = jsonpath.parse(json_path)
 
-        matches = [match.value for match in expr.find(data)]
+@tool("Query JSON String Paths")
+def query_json_string_paths(json_string: str, json_paths: list) -> str:
+    """Extract data from a JSON string using several JSONPath expressions at once.
 
-        if not matches:
+    Args:
+        json_string: A valid JSON string to query.
+        json_paths: A list of JSONPath expressions (e.g. ["$.doc_detail.file_name",
+                    "$.doc_detail.result_content"]).
 
-            raise Exception(f"No matches found for '{json_path}' in '{json_string}'.")
+    Returns:
+        A JSON object mapping each expression to its matched value(s) as a
+        string, or an empty string if not found.
+    """
+    return json.dumps(extract_json_paths(json_string, json_paths))
 
-        return str(matches[0]) if len(matches) == 1 else str(matches)
 
-    except Exception as e:
-        logging.error(f"Error parsing '{json_path}' from {json_string}: {e}")
-        return ""
+def read_file_head(file_path: Path, max_bytes: int) -> tuple:
+    """Read at most max_bytes of a UTF-8 file.
 
+    Large files are memory-mapped, so only the pages that are read are
+    loaded. A multi-byte character cut by the limit is dropped.
 
-@tool("Read Files By Pattern")
-def read_files_by_pattern(directory: str, pattern: str,
-                          base_dir: str = ".") -> str:
-    """Read all files matching a glob pattern within a safe base directory.
+    Args:
+        file_path: The file to read.
+        max_bytes: The maximum number of bytes to read.
+
+    Returns:
+        The decoded text and the size of the file in bytes.
+    """
+    size = file_path.stat().st_size
+
+    with open(file_path, "rb") as file:
+
+        if size >= _MMAP_THRESHOLD:
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[:max_bytes]
+
+        else:
+            data = file.read(max_bytes)
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    return decoder.decode(data, final=size <= max_bytes), size
+
+
+def read_files_page(directory: str, pattern: str, base_dir: str = ".",
+                    cursor: int = 0, max_bytes: int = None,
+                    max_tokens: int = None, max_file_bytes: int = None) -> str:
+    """Read one page of the files matching a glob pattern.
+
+    Files are read in path order until the page budget is used up. Files
+    larger than max_file_bytes are truncated with a marker, and when files
+    remain the page ends with the cursor of the next page.
 
     Args:
         directory: The directory to search in (relative to base_dir).
         pattern: The glob pattern to match (e.g. "*.yaml", "**/*.py").
         base_dir: The root directory to restrict access to.
+        cursor: The index of the first matching file to read.
+        max_bytes: The byte budget of the page (FILE_TOOLS_MAX_PAGE_BYTES).
+        max_tokens: An optional token budget of the page.
+        max_file_bytes: The byte budget of each file (FILE_TOOLS_MAX_FILE_BYTES).
 
     Returns:
-        The concatenated contents of all matching files.
+        The contents of the files of the page.
     """
     base = Path(base_dir).resolve()
 
@@ -69,9 +231,20 @@ def read_files_by_pattern(directory: str, pattern: str,
 
         return ""
 
-    results = []
+    budget = int(max_bytes or _MAX_PAGE_BYTES)
+
+    if max_tokens:
+        budget = min(budget, int(max_tokens) * _BYTES_PER_TOKEN)
+
+    file_budget = int(max_file_bytes or _MAX_FILE_BYTES)
 
-    for file_path in sorted(search_dir.glob(pattern)):
+    file_paths = file_cache_util.glob_cached(search_dir, pattern)
+
+    results, index = [], max(int(cursor or 0), 0)
+
+    while index < len(file_paths) and budget > 0:
+
+        file_path = file_paths[index]
 
         resolved = file_path.resolve()
 
@@ -79,26 +252,79 @@ def read_files_by_pattern(directory: str, pattern: str,
 
             logging.warning(f"Skipping '{file_path}' (outside base directory).")
 
+            index += 1
+
             continue
 
         if not resolved.is_file():
 
+            index += 1
+
             continue
 
+        header = f"--- {resolved.relative_to(base)} ---\n"
+
+        limit = max(min(file_budget, budget - len(header)), 0)
+
         try:
-            content = resolved.read_text(encoding="utf-8")
+            size = resolved.stat().st_size
 
-            results.append(f"--- {resolved.relative_to(base)} ---\n{content}")
+            # Leave files which would be cut short by the page budget for the next page.
+            if results and limit < min(file_budget, size):
+                break
+
+            content = file_cache_util.read_cached(resolved,
+                                                  lambda path: read_file_head(path, limit)[0],
+                                                  variant=limit)
+
+            read = len(content.encode("utf-8"))
+
+            if read < size:
+                content += f"\n[... truncated: showing {read} of {size} bytes ...]"
+
+            results.append(header + content)
+
+            budget -= len(header) + read
 
         except Exception as e:
 
             logging.error(f"Error reading '{resolved}': {e}")
 
-    logging.info(f"Read {len(results)} file(s) matching '{pattern}' in '{search_dir}'.")
+        index += 1
+
+    if index < len(file_paths):
+        results.append(f"[... {len(file_paths) - index} more path(s) match '{pattern}'; "
+                       f"call again with cursor={index} ...]")
+
+    logging.info(f"Read files {cursor}-{index} of {len(file_paths)} matching '{pattern}' in '{search_dir}'.")
 
     return "\n\n".join(results)
 
 
+@tool("Read Files By Pattern")
+def read_files_by_pattern(directory: str, pattern: str,
+                          base_dir: str = ".", cursor: int = 0,
+                          max_bytes: int = None, max_tokens: int = None) -> str:
+    """Read a page of the files matching a glob pattern within a safe base directory.
+
+    Args:
+        directory: The directory to search in (relative to base_dir).
+        pattern: The glob pattern to match (e.g. "*.yaml", "**/*.py").
+        base_dir: The root directory to restrict access to.
+        cursor: Where to continue from; use the cursor given at the end of
+                the previous page. Defaults to 0 (the first page).
+        max_bytes: Optional byte budget of the page.
+        max_tokens: Optional token budget of the page.
+
+    Returns:
+        The contents of the matching files of the page. Large files are
+        truncated with a marker, and if more files match, the page ends with
+        the cursor of the next page.
+    """
+    return read_files_page(directory, pattern, base_dir=base_dir, cursor=cursor,
+                           max_bytes=max_bytes, max_tokens=max_tokens)
+
+
 @tool("Read File By Name")
 def read_file_by_name(file_name: str) -> str:
     """Read a single file by name within a safe base directory.
@@ -128,7 +354,8 @@ def read_file_by_name(file_name: str) -> str:
         return ""
 
     try:
-        content = file_path.read_text(encoding="utf-8")
+        content = file_cache_util.read_cached(file_path,
+                                              lambda path: path.read_text(encoding="utf-8"))
 
         logging.info(f"Read file '{file_path.relative_to(base)}'.")
 
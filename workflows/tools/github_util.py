@@ -297,6 +297,42 @@ def move_top_issue_to_status(old_status: str, new_status: str,
         logging.error(traceback.format_exc())
 
 
+def move_issue_to_status(issue_number: int, new_status: str,
+                         project: str = "Release 1"):
+    """Move the issue with the given number to a status in the given project."""
+    try:
+        logging.info(f"Moving issue #{issue_number} to '{new_status}'...")
+
+        project_id, status_field_id, status_options = _get_project_metadata(project)
+
+        if new_status not in status_options:
+            raise Exception(f"Status '{new_status}' not found in project '{project}'.")
+
+        query = graphql_util.get_query_string("nodes_with_issue_content")
+
+        data = graphql_util.query(query, _GITHUB_TOKEN, {"projectId": project_id})
+
+        item_ids = [item["id"] for item in data["node"]["items"]["nodes"]
+                    if (item.get("content") or {}).get("number") == issue_number]
+
+        if not item_ids:
+            raise Exception(f"Issue #{issue_number} not found in project '{project}'.")
+
+        mutation = graphql_util.get_query_string("update_project_status_mutation")
+
+        graphql_util.query(mutation, _GITHUB_TOKEN, {
+            "projectId": project_id,
+            "itemId": item_ids[0],
+            "fieldId": status_field_id,
+            "optionId": status_options[new_status],
+        })
+
+        logging.info(f"Successfully moved issue #{issue_number} to '{new_status}'")
+    except Exception as e:
+        logging.error(f"Error moving issue #{issue_number} to status '{new_status}': {e}")
+        logging.error(traceback.format_exc())
+
+
 def is_project_empty(project: str = "Release 1") -> bool:
     """Check whether a Kanban project board has no issues."""
     try:
@@ -0,0 +1,137 @@
+###############################################################################
+#  Provides methods for storing evaluation results as typed, columnar Parquet
+#  files partitioned by run and metric, ex.
+#  eval_results/run_id=20250101T000000-1a2b3c4d/metric=answer_relevancy/
+#  part-00000.parquet
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import math
+import time
+import uuid
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_models.data_models import EvalElementDetails
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_RESULTS_DIR = os.getenv("EVALUATION_RESULTS_DIR", "eval_results")
+
+# The list fields of the evaluation records.
+_LIST_COLUMNS = {name for name, field in EvalElementDetails.model_fields.items() if field.annotation is list}
+
+
+##############################################
+# Utilities
+##############################################
+def new_run_id() -> str:
+    """Returns a new, time-ordered evaluation run id."""
+    return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+##############################################
+# Result Writer
+##############################################
+class ResultWriter:
+    """
+    Writes batches of evaluation results to the Parquet partition of a run
+    and metric, one part file per batch. The schema of the partition is
+    fixed by the first part, and every later part is cast to it.
+    """
+    def __init__(self, metric: str, run_id: str = None, results_dir: str = None,
+                 list_columns: set = None):
+        self.metric = metric
+        self.run_id = run_id or new_run_id()
+        self.path = os.path.join(results_dir or _RESULTS_DIR,
+                                 f"run_id={self.run_id}", f"metric={metric}")
+        self.rows = 0
+        self.parts = 0
+        self.list_columns = set(_LIST_COLUMNS if list_columns is None else list_columns)
+        self.schema = None
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def write(self, data: pd.DataFrame):
+        """
+        Writes a batch of results as a new part file. List columns (the
+        declared list fields, ex. "reference", and the columns holding lists
+        in the first part) are written as lists, with their scalar values
+        wrapped in single-item lists.
+        """
+        data = data.copy()
+
+        for column in data.columns:
+            if self.schema is not None:
+                is_list = (column in self.schema.names and
+                           pa.types.is_list(self.schema.field(column).type))
+            else:
+                is_list = column in self.list_columns or (
+                    data[column].dtype == object and
+                    any(isinstance(value, (list, tuple)) for value in data[column]))
+
+            if is_list:
+                self.list_columns.add(column)
+
+                data[column] = [list(value) if isinstance(value, (list, tuple))
+                                else [] if value is None or value is pd.NA
+                                or (isinstance(value, float) and math.isnan(value)) else [value]
+                                for value in data[column]]
+
+        table = pa.Table.from_pandas(data, preserve_index=True)
+
+        if self.schema is None:
+            # Columns without any value in the first part are typed as strings
+            # (or lists of strings), so later parts with values can be cast.
+            self.schema = pa.schema([field.with_type(pa.list_(pa.string()) if field.name in self.list_columns
+                                                     else pa.string())
+                                     if pa.types.is_null(field.type)
+                                     or (pa.types.is_list(field.type) and pa.types.is_null(field.type.value_type))
+                                     else field
+                                     for field in table.schema], metadata=table.schema.metadata)
+
+        table = self._cast(table)
+
+        pq.write_table(table, os.path.join(self.path, f"part-{self.parts:05d}.parquet"))
+
+        self.parts += 1
+
+        self.rows += len(data)
+
+    def _cast(self, table: pa.Table) -> pa.Table:
+        """Casts a part to the partition schema; missing columns are null."""
+        extra = [name for name in table.column_names if name not in self.schema.names]
+
+        if extra:
+            logging.warning(f"Dropping columns {extra} which are not in the {self.metric} results schema.")
+
+        return pa.Table.from_arrays([table.column(field.name).cast(field.type) if field.name in table.column_names
+                                     else pa.nulls(len(table), field.type)
+                                     for field in self.schema], schema=self.schema)
+
+    def summary(self, scores: dict = None) -> str:
+        """Returns a short summary of the written results for the agent."""
+        logging.info(f"Wrote {self.rows} row(s) of {self.metric} results to {self.path}.")
+
+        scores = ", ".join(f"{name}={value:.4f}" for name, value in (scores or {}).items())
+
+        return (f"Evaluated {self.rows} row(s) for metric '{self.metric}' (run {self.run_id}). "
+                f"{'Scores: ' + scores + '. ' if scores else ''}"
+                f"Results saved as Parquet to {self.path}")
+
+
+def read_results(path: str, columns: list = None) -> pa.Table:
+    """
+    Reads the Parquet results under the given path (a results directory, a
+    run or metric partition, or a single part file).
+    :param path: The results path.
+    :param columns: The columns to read. Defaults to all columns.
+    :return: The results as an Arrow table.
+    """
+    return pq.read_table(path, columns=columns)
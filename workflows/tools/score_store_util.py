@@ -0,0 +1,88 @@
+###############################################################################
+#  Provides a local, persistent store for evaluation scores keyed by content
+#  hash, so that re-evaluations only score new or changed rows.
+###############################################################################
+
+##############################################
+# Imports
+##############################################
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List
+logging.basicConfig(level=logging.INFO)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_CACHE_DIR = os.getenv("EVALUATION_CACHE_DIR", ".eval_cache")
+
+# Stay well below SQLite's limit on the number of query parameters.
+_QUERY_CHUNK_SIZE = 500
+
+_STORES = {}
+
+_STORES_LOCK = threading.Lock()
+
+
+##############################################
+# Utilities
+##############################################
+def get_content_hash(*parts: Any) -> str:
+    """Returns a stable hash of the given JSON-serializable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str)
+                          .encode("utf-8")).hexdigest()
+
+
+##############################################
+# Score Store
+##############################################
+class ScoreStore:
+    """A SQLite-backed key/value store of JSON-serializable scores."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Returns the stored scores of the given keys which are present."""
+        keys = list(dict.fromkeys(keys))
+
+        results = {}
+
+        with self._lock:
+            for start in range(0, len(keys), _QUERY_CHUNK_SIZE):
+                chunk = keys[start:start + _QUERY_CHUNK_SIZE]
+
+                rows = self._db.execute(f"SELECT key, value FROM scores WHERE key IN "
+                                        f"({', '.join('?' * len(chunk))})", chunk).fetchall()
+
+                results.update({key: json.loads(value) for key, value in rows})
+
+        return results
+
+    def put_many(self, scores: Dict[str, Any]):
+        """Stores the given scores."""
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?)",
+                                 [(key, json.dumps(value)) for key, value in scores.items()])
+            self._db.commit()
+
+
+def get_score_store(name: str) -> ScoreStore:
+    """
+    Returns the process-wide score store with the given name, stored under
+    the EVALUATION_CACHE_DIR directory.
+    """
+    with _STORES_LOCK:
+        if name not in _STORES:
+            _STORES[name] = ScoreStore(os.path.join(_CACHE_DIR, f"{name}.db"))
+
+        return _STORES[name]
@@ -3,12 +3,14 @@ evaluations."""
 
 from crewai.tools import tool
 from tools import unittest_util
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
 @tool("Run test suite")
-def run_test_suite(eval_data_file_path: str, evaluation_cutoff: float = 0.7):
+def run_test_suite(eval_data_file_path: str, evaluation_cutoff: float = 0.7,
+                   metric_cutoffs: str = ""):
     """
     Runs test suite associated with the test data in
     the given file path.
@@ -16,6 +18,11 @@ def run_test_suite(eval_data_file_path: str, evaluation_cutoff: float = 0.7):
         eval_data_file_path: Path to the evaluation data file.
         evaluation_cutoff: Threshold used to determine a cutoff score for
         passing evaluations. Defaults to 0.7.
+        metric_cutoffs: (Optional) Per-metric cutoffs as a JSON object keyed
+        by score column, ex. {"bleu4_score": 0.3}. Metrics which are not
+        listed use their default cutoff, or evaluation_cutoff.
+    Returns:
+        A summary of the test run.
     """
-    return unittest_util.run_test_suite(eval_data_file_path, evaluation_cutoff)
-
+    return unittest_util.run_test_suite(eval_data_file_path, evaluation_cutoff,
+                                        json.loads(metric_cutoffs) if metric_cutoffs else None)
@@ -1,28 +1,68 @@
 import pytest
-import csv
 import os
+import sys
+import json
+import importlib.util
 import logging
 logging.basicConfig(level=logging.INFO)
 
-@pytest.fixture
-def set_env_variables(monkeypatch):
-    """Reads data from a CSV file and returns a list of dictionaries."""
-    filepath = os.path.join(os.path.dirname(__file__), "evaluation_data.csv")
+# The evaluation threshold gate, which is also copied into the tested
+# repositories and therefore only depends on pytest.
+_EVALUATION_TESTS = os.getenv("EVALUATION_TESTS_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "examples", "multi-agent", "agents", "sprint_planning", "test", "artifacts", "evaluation_tests.py")
 
-    with open(filepath, 'r', encoding='utf-8') as csvfile:
+def _load_evaluation_tests():
+    spec = importlib.util.spec_from_file_location("tools._evaluation_tests", _EVALUATION_TESTS)
 
-        reader = csv.DictReader(csvfile)
+    module = importlib.util.module_from_spec(spec)
 
-        monkeypatch.setenv("_TEST_ROWS", str([row for row in reader]))
+    spec.loader.exec_module(module)
 
-        monkeypatch.setenv("_EVALUATION_CUTOFF", "0.7")
+    return module
 
-def test_csv_row_data():
+evaluation_tests = _load_evaluation_tests()
+
+load_score_columns = evaluation_tests.load_score_columns
+
+find_failing_rows = evaluation_tests.find_failing_rows
+
+def pytest_addoption(parser):
+    """Adds the evaluation gate options, when loaded with -p tools.unittest_util."""
+    parser.addoption(
+        "--evaluation_data",
+        action="store",
+        default=None,
+        help='Specify evaluation data file path (CSV, or Parquet file or directory).'
+    )
+
+    parser.addoption(
+        "--evaluation_threshold",
+        action="store",
+        default=None,
+        help='Specify evaluation threshold.'
+    )
+
+    parser.addoption(
+        "--evaluation_thresholds",
+        action="store",
+        default=None,
+        help='Specify per-metric evaluation thresholds as JSON, ex. {"bleu4_score": 0.3}.'
+    )
+
+def run_test_suite(eval_data_file_path: str, evaluation_cutoff: float = 0.7,
+                   metric_cutoffs: dict = None):
     """
-    Evaluate the relevancy score of given rows and asserts that it meets a specified threshold.
+    Runs the evaluation threshold gate against the given evaluation results.
+    :param eval_data_file_path: Path to the evaluation results.
+    :param evaluation_cutoff: The passing score of the metrics without their own cutoff.
+    :param metric_cutoffs: (Optional) The passing score of each metric, by score column name.
+    :return: A summary of the test run.
     """
-    for row in ",".split(os.getenv("_TEST_ROWS")):
-
-        if 'eval_scores_relevancy' in row:
+    exit_code = pytest.main(["-q", "-p", "no:cacheprovider", _EVALUATION_TESTS,
+                             "--evaluation_data", eval_data_file_path,
+                             "--evaluation_threshold", str(evaluation_cutoff),
+                             "--evaluation_thresholds", json.dumps(metric_cutoffs or {})],
+                            plugins=[sys.modules[__name__]])
 
-            assert (row['eval_scores_relevancy'] >= int(os.getenv("_EVALUATION_CUTOFF")))
\ No newline at end of file
+    return f"Test suite {'passed' if exit_code == 0 else 'failed'} (exit code {int(exit_code)})."